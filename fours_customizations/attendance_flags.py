@@ -0,0 +1,96 @@
+"""
+Late entry / early exit classification for Fours Customizations
+Derives missing Attendance flags from in/out times against the shift start/end plus grace periods
+"""
+
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import cint, get_datetime, get_time, getdate
+
+from fours_customizations.replica import on_replica
+
+CACHE_KEY = 'fours_shift_windows'
+
+
+def get_shift_windows():
+	"""
+	Get every Shift Type's window, loaded with one query and cached in Redis.
+
+	Returns:
+		dict: Shift Type -> (start seconds, end seconds, late grace seconds, early exit grace seconds)
+	"""
+	windows = frappe.cache().get_value(CACHE_KEY)
+
+	if windows is None:
+		windows = {}
+		for shift in frappe.get_all(
+			'Shift Type',
+			fields=['name', 'start_time', 'end_time', 'late_entry_grace_period', 'early_exit_grace_period']
+		):
+			if not shift.start_time or not shift.end_time:
+				continue
+
+			windows[shift.name] = (
+				_seconds_of_day(shift.start_time),
+				_seconds_of_day(shift.end_time),
+				cint(shift.late_entry_grace_period) * 60,
+				cint(shift.early_exit_grace_period) * 60
+			)
+
+		# Replica reads may lag behind the invalidation hooks, so don't cache them
+		if not on_replica():
+			frappe.cache().set_value(CACHE_KEY, windows)
+
+	return windows
+
+
+def _seconds_of_day(value):
+	value = get_time(value)
+	return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def derive_flags(att, shift_windows, default_shift=None, assigned_shift=None):
+	"""
+	Set late_entry / early_exit on an attendance row from its in/out times when they are unset.
+
+	Flags already set on the row are kept. Rows without a known shift (the one assigned that
+	day, else the row's own, else the employee's default shift) are left unchanged. Each row is classified with a dict
+	lookup and two comparisons, so no per-record shift queries are made.
+
+	Args:
+		att (frappe._dict): Attendance row with status, attendance_date, shift, in_time, out_time
+		shift_windows (dict): From get_shift_windows
+		default_shift (str): Employee's default Shift Type
+		assigned_shift (str): Shift Type of the day's Shift Assignment, see get_scheduled_shift
+
+	Returns:
+		frappe._dict: The same row
+	"""
+	if att.status not in ['Present', 'Half Day']:
+		return att
+
+	window = shift_windows.get(assigned_shift or att.get('shift') or default_shift)
+	if not window:
+		return att
+
+	start_seconds, end_seconds, late_grace, early_grace = window
+	day_start = datetime.combine(getdate(att.attendance_date), time())
+
+	if att.in_time and not att.late_entry:
+		shift_start = day_start + timedelta(seconds=start_seconds + late_grace)
+		att.late_entry = int(get_datetime(att.in_time) > shift_start)
+
+	if att.out_time and not att.early_exit:
+		# Night shifts end on the next day
+		if end_seconds <= start_seconds:
+			end_seconds += 24 * 3600
+		shift_end = day_start + timedelta(seconds=end_seconds - early_grace)
+		att.early_exit = int(get_datetime(att.out_time) < shift_end)
+
+	return att
+
+
+def invalidate_shift_windows(doc=None, method=None):
+	"""Drop the cached shift windows when a Shift Type changes"""
+	frappe.cache().delete_value(CACHE_KEY)
@@ -0,0 +1,110 @@
+"""
+Attendance queries for Fours Customizations
+Keyset-paginated iteration so long periods are streamed in bounded chunks
+"""
+
+import frappe
+from frappe.utils import cint
+
+from fours_customizations.policy import resolve_policy
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Employees per attendance scan, keeps the IN list bounded on large sites
+EMPLOYEE_GROUP_SIZE = 1000
+
+
+def get_chunk_size(chunk_size=None):
+	"""Get the attendance page size; overridable with `fours_attendance_chunk_size` in site_config.json"""
+	return cint(chunk_size or frappe.conf.get('fours_attendance_chunk_size')) or DEFAULT_CHUNK_SIZE
+
+
+def iter_attendance(employees, start_date, end_date, fields, statuses=None, chunk_size=None):
+	"""
+	Stream submitted attendance ordered by (attendance_date, name).
+
+	Each page continues after the last (attendance_date, name) seen instead of using an
+	OFFSET, so every page costs the same however far into a multi-year period it is.
+
+	Args:
+		employees (list): Employee IDs
+		start_date (str/date): Start date of the period
+		end_date (str/date): End date of the period
+		fields (list): Attendance fields to select
+		statuses (list): Optional attendance statuses to restrict to
+		chunk_size (int): Rows per page
+
+	Yields:
+		frappe._dict: One attendance row at a time
+	"""
+	if not employees:
+		return
+
+	chunk_size = get_chunk_size(chunk_size)
+	fields = list(dict.fromkeys(['name', 'attendance_date', *fields]))
+
+	Attendance = frappe.qb.DocType('Attendance')
+	base_query = (
+		frappe.qb.from_(Attendance)
+		.select(*[Attendance[fieldname] for fieldname in fields])
+		.where(Attendance.employee.isin(employees))
+		.where(Attendance.attendance_date.between(start_date, end_date))
+		.where(Attendance.docstatus == 1)  # Only submitted attendance
+		.orderby(Attendance.attendance_date)
+		.orderby(Attendance.name)
+		.limit(chunk_size)
+	)
+
+	if statuses:
+		base_query = base_query.where(Attendance.status.isin(statuses))
+
+	last_row = None
+	while True:
+		query = base_query
+		if last_row:
+			query = query.where(
+				(Attendance.attendance_date > last_row.attendance_date)
+				| ((Attendance.attendance_date == last_row.attendance_date) & (Attendance.name > last_row.name))
+			)
+
+		rows = query.run(as_dict=True)
+		yield from rows
+
+		if len(rows) < chunk_size:
+			break
+
+		last_row = rows[-1]
+
+
+def iter_employee_groups(employees):
+	"""Split a list of employees into slices of EMPLOYEE_GROUP_SIZE"""
+	for i in range(0, len(employees), EMPLOYEE_GROUP_SIZE):
+		yield employees[i:i + EMPLOYEE_GROUP_SIZE]
+
+
+def iter_attendance_with_policy(employees, start_date, end_date, fields, policies=None):
+	"""
+	Stream submitted attendance like iter_attendance, each row with its employee's policy.
+
+	Policies are resolved once per employee and kept in `policies` when given, so callers
+	can reuse them (or pass them in already resolved).
+
+	Yields:
+		tuple: (attendance row, policy)
+	"""
+	policies = {} if policies is None else policies
+
+	for att in iter_attendance(employees, start_date, end_date, fields):
+		policy = policies.get(att.employee)
+		if policy is None:
+			policy = policies[att.employee] = resolve_policy(att.employee)
+
+		yield att, policy
+
+
+def attendance_row_from_doc(doc):
+	"""Copy the fields the calculations read from an Attendance document into a plain row"""
+	return frappe._dict({
+		fieldname: doc.get(fieldname)
+		for fieldname in ['name', 'employee', 'attendance_date', 'status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit']
+	})
@@ -0,0 +1,182 @@
+"""
+Draft salary slip refresh for Fours Customizations
+Attendance changes are recorded in a Redis dirty set and applied to affected draft slips in coalesced passes
+"""
+
+import functools
+
+import frappe
+from frappe.utils import cint, get_datetime, get_first_day, get_last_day, getdate, now_datetime
+
+from fours_customizations.cost_summary import mark_months_dirty
+from fours_customizations.redis_sets import restore_members, take_members
+from fours_customizations.slip_components import acquire_slip_lock
+
+DIRTY_SET_KEY = 'fours_dirty_attendance'
+LAST_CHANGE_KEY = 'fours_dirty_attendance_last_change'
+FIRST_CHANGE_KEY = 'fours_dirty_attendance_first_change'
+
+# Wait for this many seconds without new changes before refreshing...
+DEFAULT_QUIET_SECONDS = 60
+# ...but never hold changes back for longer than this
+DEFAULT_MAX_WAIT_SECONDS = 600
+
+DEFAULT_BATCH_SIZE = 50
+
+
+def on_attendance_change(doc, method=None):
+	"""Attendance on_submit / on_cancel: mark the employee-day as dirty"""
+	mark_dirty([(doc.employee, doc.attendance_date)])
+
+
+def mark_dirty(employee_dates):
+	"""
+	Record changed (employee, attendance_date) pairs for the next refresh pass.
+
+	The pairs are recorded once the transaction commits, so a pass never refreshes a slip
+	before the change is visible and a rolled back change is never recorded. Also used by
+	bulk paths that write attendance without document hooks, before their commit.
+	"""
+	employee_dates = list(employee_dates)
+	if employee_dates:
+		frappe.db.after_commit.add(functools.partial(_record_dirty, employee_dates))
+
+
+def _record_dirty(employee_dates):
+	members = [f"{employee}|{getdate(attendance_date)}" for employee, attendance_date in employee_dates]
+
+	cache = frappe.cache()
+	cache.sadd(DIRTY_SET_KEY, *members)
+	mark_months_dirty([attendance_date for employee, attendance_date in employee_dates])
+
+	now = now_datetime()
+	cache.set_value(LAST_CHANGE_KEY, now)
+	if not cache.get_value(FIRST_CHANGE_KEY):
+		cache.set_value(FIRST_CHANGE_KEY, now)
+
+
+def refresh_dirty_slips():
+	"""
+	Scheduled job: recompute draft slips whose period covers a dirty employee-day.
+
+	Runs every minute but only drains the dirty set once changes have been quiet for
+	`fours_slip_refresh_quiet_seconds` (or have waited `fours_slip_refresh_max_wait_seconds`),
+	so an import of thousands of rows becomes one save per affected slip.
+	"""
+	cache = frappe.cache()
+	last_change = cache.get_value(LAST_CHANGE_KEY)
+	first_change = cache.get_value(FIRST_CHANGE_KEY)
+
+	# Work is pending whenever the set has members; pairs without timestamps (e.g. left by a
+	# failed pass) are refreshed straight away
+	if not cache.scard(DIRTY_SET_KEY):
+		return
+
+	if last_change:
+		quiet_seconds = cint(frappe.conf.get('fours_slip_refresh_quiet_seconds')) or DEFAULT_QUIET_SECONDS
+		max_wait_seconds = cint(frappe.conf.get('fours_slip_refresh_max_wait_seconds')) or DEFAULT_MAX_WAIT_SECONDS
+		now = now_datetime()
+
+		still_busy = (now - get_datetime(last_change)).total_seconds() < quiet_seconds
+		waited_enough = first_change and (now - get_datetime(first_change)).total_seconds() >= max_wait_seconds
+		if still_busy and not waited_enough:
+			return
+
+	# Clear the timestamps before taking the set: a pair added after this point sets them
+	# again, so it is either taken now or triggers the next pass. Taking the members
+	# empties the set atomically, so a pair marked again meanwhile is kept.
+	cache.delete_value([LAST_CHANGE_KEY, FIRST_CHANGE_KEY])
+	members = take_members(DIRTY_SET_KEY)
+
+	if not members:
+		return
+
+	try:
+		dates_by_employee = {}
+		for member in members:
+			employee, attendance_date = member.split('|', 1)
+			dates_by_employee.setdefault(employee, set()).add(getdate(attendance_date))
+
+		slips = get_affected_draft_slips(dates_by_employee)
+		enqueue_slip_refresh(slips)
+	except Exception:
+		# Keep the pairs for the next pass
+		restore_members(DIRTY_SET_KEY, members)
+		raise
+
+	frappe.logger().info(f"Queued {len(slips)} draft salary slip(s) for {len(members)} changed attendance day(s)")
+
+
+def enqueue_slip_refresh(slips):
+	"""
+	Spread slip recomputation over background workers in batches.
+
+	Batches of `fours_slip_refresh_batch_size` (default 50) can run on any number of
+	workers at once; the per-slip lock taken by the handler keeps them from colliding.
+	"""
+	batch_size = cint(frappe.conf.get('fours_slip_refresh_batch_size')) or DEFAULT_BATCH_SIZE
+
+	for i in range(0, len(slips), batch_size):
+		frappe.enqueue(
+			'fours_customizations.attendance_sync.refresh_slips',
+			queue='long',
+			slips=slips[i:i + batch_size]
+		)
+
+
+def refresh_slips(slips):
+	"""Background job: re-save each draft slip under its lock, committing one slip at a time"""
+	for slip in slips:
+		try:
+			# Locking read: doesn't start the transaction snapshot, so the slip loaded
+			# after taking the lock reflects any concurrent save that committed first
+			employee, start_date, docstatus = frappe.db.get_value(
+				'Salary Slip', slip, ['employee', 'start_date', 'docstatus'], for_update=True
+			) or (None, None, None)
+
+			if docstatus != 0:
+				frappe.db.commit()
+				continue
+
+			acquire_slip_lock(employee, start_date)
+			frappe.get_doc('Salary Slip', slip).save(ignore_permissions=True)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			frappe.log_error(f"Could not refresh Salary Slip {slip}", "Salary Slip Refresh")
+
+
+def get_affected_draft_slips(dates_by_employee):
+	"""
+	Find draft salary slips whose period contains at least one of the employee's changed dates.
+
+	Dates in a slip's first month before its period count too: they feed the monthly
+	overtime cap's carry-in of periods that start mid-month.
+
+	Args:
+		dates_by_employee (dict): Employee ID -> set of changed dates
+
+	Returns:
+		list: Salary Slip names, each at most once
+	"""
+	if not dates_by_employee:
+		return []
+
+	all_dates = [d for dates in dates_by_employee.values() for d in dates]
+
+	candidates = frappe.get_all(
+		'Salary Slip',
+		filters={
+			'docstatus': 0,
+			'employee': ['in', list(dates_by_employee)],
+			'start_date': ['<=', get_last_day(max(all_dates))],
+			'end_date': ['>=', min(all_dates)]
+		},
+		fields=['name', 'employee', 'start_date', 'end_date']
+	)
+
+	return [
+		slip.name
+		for slip in candidates
+		if any(get_first_day(slip.start_date) <= d <= slip.end_date for d in dates_by_employee[slip.employee])
+	]
@@ -0,0 +1,214 @@
+"""
+Biometric attendance ingestion for Fours Customizations
+Streams device punch logs, keeps first-in / last-out per employee-day and bulk inserts
+submitted Attendance with late entry / early exit flags derived from the day's shift
+
+Usage:
+	bench --site YOUR_SITE import-biometric-logs punches-2025-11.csv
+"""
+
+import csv
+from datetime import datetime, timedelta
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+from fours_customizations.attendance_flags import derive_flags
+from fours_customizations.attendance_query import iter_employee_groups
+from fours_customizations.attendance_sync import mark_dirty
+from fours_customizations.rolling_counters import invalidate_employee_counters
+from fours_customizations.self_service import invalidate_employee_accumulators
+from fours_customizations.shift_schedule import get_scheduled_shift, load_shift_schedule
+
+NAME_PREFIX = 'BIO-ATT'
+
+DEFAULT_CHUNK_SIZE = 5000
+
+ATTENDANCE_FIELDS = [
+	'name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus',
+	'employee', 'employee_name', 'attendance_date', 'status', 'company', 'department',
+	'shift', 'in_time', 'out_time', 'late_entry', 'early_exit'
+]
+
+
+def import_biometric_logs(paths, employee_column='device_id', time_column='timestamp', time_format=None, day_start_hour=0, chunk_size=None):
+	"""
+	Create submitted Attendance from device punch logs.
+
+	Each CSV file is read row by row and only the first and last punch of every
+	employee-day is kept, so memory grows with employee-days, not punches. Employee-days
+	that already have Attendance (draft or submitted) are left alone and rows are named
+	after the employee and date, so importing the same or overlapping files again is safe.
+	A day whose imported row was cancelled also counts as existing, as its name is taken;
+	amend the cancelled Attendance to record the day again. Punches with an unreadable
+	time are counted as unknown.
+
+	Args:
+		paths (list): CSV files with a header row
+		employee_column (str): Column holding the Employee's Attendance Device ID (or Employee ID)
+		time_column (str): Column holding the punch date and time
+		time_format (str): strptime format of the punch time; parsed leniently when omitted
+		day_start_hour (int): Punches before this hour count towards the previous day (night shifts)
+		chunk_size (int): Rows per bulk insert
+
+	Returns:
+		dict: {'punches', 'unknown_punches', 'inserted', 'existing'}
+	"""
+	if isinstance(paths, str):
+		paths = [paths]
+
+	chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+	employees = _get_employee_map()
+	days, punches, unknown = _read_punches(paths, employees, employee_column, time_column, time_format, cint(day_start_hour))
+
+	inserted = existing = 0
+	keys = sorted(days)
+
+	for i in range(0, len(keys), chunk_size):
+		chunk = keys[i:i + chunk_size]
+		recorded = _get_existing_days(chunk)
+		new_keys = [key for key in chunk if key not in recorded]
+		existing += len(chunk) - len(new_keys)
+
+		if not new_keys:
+			continue
+
+		shift_schedule = _load_shift_schedule(new_keys)
+		values = [
+			_build_row(employees[employee], attendance_date, shift_schedule, *days[(employee, attendance_date)])
+			for employee, attendance_date in new_keys
+		]
+		frappe.db.bulk_insert('Attendance', ATTENDANCE_FIELDS, values, chunk_size=chunk_size, ignore_duplicates=True)
+		# Document hooks don't run for bulk inserts; recorded when the chunk commits
+		mark_dirty(new_keys)
+		frappe.db.commit()
+		inserted += len(new_keys)
+
+	for employee in {employee for employee, attendance_date in keys}:
+		invalidate_employee_accumulators(frappe._dict(name=employee))
+		invalidate_employee_counters(frappe._dict(name=employee))
+
+	return {'punches': punches, 'unknown_punches': unknown, 'inserted': inserted, 'existing': existing}
+
+
+def _get_employee_map():
+	"""Employees keyed by Attendance Device ID and by Employee ID"""
+	employees = {}
+
+	for emp in frappe.get_all(
+		'Employee',
+		fields=['name', 'employee_name', 'company', 'department', 'default_shift', 'attendance_device_id']
+	):
+		employees[emp.name] = emp
+		if emp.attendance_device_id:
+			employees[emp.attendance_device_id] = emp
+
+	return employees
+
+
+def _read_punches(paths, employees, employee_column, time_column, time_format, day_start_hour):
+	"""Stream the files into {(employee, attendance_date): [first punch, last punch]}"""
+	days = {}
+	punches = unknown = 0
+
+	for path in paths:
+		with open(path, newline='', encoding='utf-8-sig') as f:
+			for row in csv.DictReader(f):
+				emp = employees.get((row.get(employee_column) or '').strip())
+				value = (row.get(time_column) or '').strip()
+
+				if not emp or not value:
+					unknown += 1
+					continue
+
+				try:
+					punch = datetime.strptime(value, time_format) if time_format else get_datetime(value)
+				except (ValueError, OverflowError):
+					unknown += 1
+					continue
+
+				attendance_date = (punch - timedelta(hours=day_start_hour)).date()
+				punches += 1
+
+				span = days.get((emp.name, attendance_date))
+				if span is None:
+					days[(emp.name, attendance_date)] = [punch, punch]
+				elif punch < span[0]:
+					span[0] = punch
+				elif punch > span[1]:
+					span[1] = punch
+
+	return days, punches, unknown
+
+
+def _get_existing_days(keys):
+	"""
+	(employee, attendance_date) pairs among keys that already have Attendance.
+
+	Cancelled Attendance only counts when it holds the name the import would use, since
+	the insert would be dropped as a duplicate.
+	"""
+	employees = sorted({employee for employee, attendance_date in keys})
+	dates = [attendance_date for employee, attendance_date in keys]
+	recorded = set()
+
+	for group in iter_employee_groups(employees):
+		for att in frappe.get_all(
+			'Attendance',
+			filters={
+				'employee': ['in', group],
+				'attendance_date': ['between', [min(dates), max(dates)]]
+			},
+			fields=['name', 'employee', 'attendance_date', 'docstatus']
+		):
+			if att.docstatus != 2 or att.name == _get_row_name(att.employee, att.attendance_date):
+				recorded.add((att.employee, att.attendance_date))
+
+	return recorded
+
+
+def _load_shift_schedule(keys):
+	"""Shift Assignments of the employees among keys over their dates, one query per employee group"""
+	employees = sorted({employee for employee, attendance_date in keys})
+	dates = [attendance_date for employee, attendance_date in keys]
+	shift_schedule = None
+
+	for group in iter_employee_groups(employees):
+		group_schedule = load_shift_schedule(group, min(dates), max(dates))
+		if shift_schedule is None:
+			shift_schedule = group_schedule
+		else:
+			shift_schedule.assignments.update(group_schedule.assignments)
+
+	return shift_schedule
+
+
+def _get_row_name(employee, attendance_date):
+	"""Name of the imported Attendance of an employee-day"""
+	return f"{NAME_PREFIX}-{employee}-{attendance_date:%Y%m%d}"
+
+
+def _build_row(emp, attendance_date, shift_schedule, first_punch, last_punch):
+	"""
+	Attendance values for one employee-day; a single punch is an entry without checkout.
+
+	The shift is the day's Shift Assignment, else the employee's default shift.
+	"""
+	now = now_datetime()
+
+	att = frappe._dict({
+		'attendance_date': attendance_date,
+		'status': 'Present',
+		'shift': get_scheduled_shift(shift_schedule, emp.name, attendance_date) or emp.default_shift,
+		'in_time': first_punch,
+		'out_time': last_punch if last_punch > first_punch else None,
+		'late_entry': 0,
+		'early_exit': 0
+	})
+	derive_flags(att, shift_schedule.windows)
+
+	return (
+		_get_row_name(emp.name, attendance_date), now, now, frappe.session.user, frappe.session.user, 1,
+		emp.name, emp.employee_name, attendance_date, att.status, emp.company, emp.department,
+		att.shift, att.in_time, att.out_time, att.late_entry, att.early_exit
+	)
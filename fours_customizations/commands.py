@@ -0,0 +1,75 @@
+"""
+Bench commands for Fours Customizations
+"""
+
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command('export-payroll-facts')
+@click.option('--from-date', required=True, help='Start date of the period (YYYY-MM-DD)')
+@click.option('--to-date', required=True, help='End date of the period (YYYY-MM-DD)')
+@click.option('--output', required=True, help='File to write')
+@click.option(
+	'--format',
+	'file_format',
+	type=click.Choice(['parquet', 'arrow']),
+	default='parquet',
+	help='Parquet, or Arrow IPC file format for memory-mapping'
+)
+@click.option('--company', help='Only export employees of this company')
+@click.option('--batch-size', type=int, help='Rows per record batch')
+@pass_context
+def export_payroll_facts(context, from_date, to_date, output, file_format, company, batch_size):
+	"""Export per-employee, per-day attendance and overtime facts for analytics"""
+	import frappe
+
+	from fours_customizations.fact_export import export_payroll_facts as export
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+
+	try:
+		result = export(from_date, to_date, output, file_format=file_format, company=company, batch_size=batch_size)
+	finally:
+		frappe.destroy()
+
+	click.echo(f"Wrote {result['rows']} rows in {result['batches']} batches to {result['path']}")
+
+
+@click.command('import-biometric-logs')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--employee-column', default='device_id', help="Column with the Employee's Attendance Device ID or Employee ID")
+@click.option('--time-column', default='timestamp', help='Column with the punch date and time')
+@click.option('--time-format', help='strptime format of the punch time, e.g. %Y-%m-%d %H:%M:%S')
+@click.option('--day-start-hour', type=int, default=0, help='Punches before this hour count towards the previous day')
+@click.option('--chunk-size', type=int, help='Rows per bulk insert')
+@pass_context
+def import_biometric_logs(context, paths, employee_column, time_column, time_format, day_start_hour, chunk_size):
+	"""Create submitted Attendance from biometric device punch logs (CSV)"""
+	import frappe
+
+	from fours_customizations.biometric_import import import_biometric_logs as run_import
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+
+	try:
+		result = run_import(
+			list(paths),
+			employee_column=employee_column,
+			time_column=time_column,
+			time_format=time_format,
+			day_start_hour=day_start_hour,
+			chunk_size=chunk_size
+		)
+	finally:
+		frappe.destroy()
+
+	click.echo(
+		f"Read {result['punches']} punches ({result['unknown_punches']} unmatched): "
+		f"{result['inserted']} attendance created, {result['existing']} already recorded"
+	)
+
+
+commands = [export_payroll_facts, import_biometric_logs]
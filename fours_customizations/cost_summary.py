@@ -0,0 +1,189 @@
+"""
+Attendance cost summaries for Fours Customizations
+Months with attendance changes are re-aggregated by a scheduled job into Attendance Cost Summary
+(period x company x designation x department), which dashboards read instead of attendance
+"""
+
+import frappe
+from frappe.utils import cint, get_datetime, get_first_day, get_last_day, now_datetime, today
+
+from fours_customizations.attendance_flags import get_shift_windows
+from fours_customizations.attendance_query import iter_attendance_with_policy, iter_employee_groups
+from fours_customizations.deduction_tiers import price_dated_occurrences
+from fours_customizations.leave_calendar import get_leave_dates
+from fours_customizations.money import from_minor
+from fours_customizations.overtime_utils import summarize_overtime
+from fours_customizations.rate_versions import get_occurrence_rates
+from fours_customizations.redis_sets import restore_members, take_members
+from fours_customizations.replica import use_read_replica
+from fours_customizations.salary_slip_handler import VIOLATION_TYPES, get_row_contribution
+from fours_customizations.shift_schedule import load_shift_schedule
+
+DIRTY_MONTHS_KEY = 'fours_cost_summary_dirty_months'
+LAST_MARK_KEY = 'fours_cost_summary_last_mark'
+
+# Months marked this recently before a run are rebuilt again on the next one, in case the
+# read replica hadn't applied the change yet
+DEFAULT_REPLICA_LAG_SECONDS = 300
+
+
+def mark_months_dirty(dates):
+	"""
+	Record the months of changed attendance dates for the next summary run.
+
+	Call once the change is committed (attendance_sync.mark_dirty does).
+	"""
+	months = {str(get_first_day(d)) for d in dates}
+	if months:
+		frappe.cache().sadd(DIRTY_MONTHS_KEY, *months)
+		frappe.cache().set_value(LAST_MARK_KEY, now_datetime())
+
+
+def mark_current_month_dirty(doc=None, method=None):
+	"""Rates or assignments changed: re-aggregate the running month once the change commits"""
+	frappe.db.after_commit.add(lambda: mark_months_dirty([today()]))
+
+
+def update_cost_summaries():
+	"""
+	Scheduled job: re-aggregate every month with attendance changes since the last run.
+
+	Only changed months are rebuilt, each with one streamed pass over that month's
+	attendance, so dashboard reads never touch attendance at all. The months are taken
+	from the dirty set before aggregating, so a month marked again meanwhile is rebuilt
+	on the next run.
+	"""
+	months = sorted(take_members(DIRTY_MONTHS_KEY))
+	if not months:
+		return
+
+	taken_at = now_datetime()
+	last_mark = frappe.cache().get_value(LAST_MARK_KEY)
+
+	for i, month in enumerate(months):
+		try:
+			rebuild_cost_summary(month)
+		except Exception:
+			restore_members(DIRTY_MONTHS_KEY, months[i:])
+			raise
+
+	# The aggregation reads the replica, which may not have applied the latest marked changes
+	lag_seconds = cint(frappe.conf.get('fours_replica_lag_seconds')) or DEFAULT_REPLICA_LAG_SECONDS
+	if frappe.conf.read_from_replica and last_mark and (taken_at - get_datetime(last_mark)).total_seconds() < lag_seconds:
+		restore_members(DIRTY_MONTHS_KEY, months)
+
+
+def rebuild_cost_summary(period):
+	"""
+	Replace a month's Attendance Cost Summary rows.
+
+	Args:
+		period (str/date): Any date in the month
+	"""
+	period = get_first_day(period)
+	groups = _aggregate_month(period, get_last_day(period))
+
+	frappe.db.delete('Attendance Cost Summary', {'period': period})
+
+	for (company, designation, department), totals in groups.items():
+		frappe.get_doc({
+			'doctype': 'Attendance Cost Summary',
+			'period': period,
+			'company': company,
+			'designation': designation,
+			'department': department,
+			'employee_count': totals['employee_count'],
+			'overtime_hours': round(totals['overtime_seconds'] / 3600, 2),
+			'overtime_amount': from_minor(totals['overtime_minor']),
+			'deduction_amount': from_minor(totals['deduction_minor']),
+			**{f'{key}_count': totals['counts'][key] for key in VIOLATION_TYPES}
+		}).insert(ignore_permissions=True)
+
+	frappe.db.commit()
+
+
+@use_read_replica
+def _aggregate_month(start_date, end_date):
+	"""Price every employee's month with the slip rules and total them per group"""
+	employees = frappe.get_all('Employee', pluck='name', order_by='name')
+	groups = {}
+
+	for group in iter_employee_groups(employees):
+		leave_dates = get_leave_dates(group, start_date, end_date)
+		shift_schedule = load_shift_schedule(group, start_date, end_date)
+		policies = {}
+		contributions = {}
+
+		for att, policy in iter_attendance_with_policy(
+			group,
+			start_date,
+			end_date,
+			fields=['employee', 'status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit', 'modified'],
+			policies=policies
+		):
+			shift_windows = get_shift_windows() if policy.derive_attendance_flags else None
+			contributions.setdefault(att.employee, []).append(
+				get_row_contribution(policy, att, leave_dates.get(att.employee, set()), shift_windows, shift_schedule)
+			)
+
+		for employee, rows in contributions.items():
+			policy = policies[employee]
+			totals = groups.setdefault((policy.company, policy.designation, policy.department), {
+				'employee_count': 0,
+				'overtime_seconds': 0,
+				'overtime_minor': 0,
+				'deduction_minor': 0,
+				'counts': {key: 0 for key in VIOLATION_TYPES}
+			})
+
+			occurrence_dates = {key: [] for key in VIOLATION_TYPES}
+			overtime_days = []
+			for attendance_date, _modified, types, overtime_entry in rows:
+				for key in types:
+					occurrence_dates[key].append(attendance_date)
+				if overtime_entry:
+					overtime_days.append(overtime_entry)
+
+			overtime = summarize_overtime(policy, overtime_days)
+
+			totals['employee_count'] += 1
+			totals['overtime_seconds'] += sum(day['overtime_seconds'] for day in overtime['daily_breakdown'])
+			totals['overtime_minor'] += overtime['total_amount_minor']
+			for key, (_component_name, rate_field) in VIOLATION_TYPES.items():
+				totals['counts'][key] += len(occurrence_dates[key])
+				totals['deduction_minor'] += price_dated_occurrences(
+					get_occurrence_rates(policy, rate_field, occurrence_dates[key]),
+					policy.deduction_tiers.get(key)
+				)
+
+	return groups
+
+
+@frappe.whitelist()
+def get_overtime_cost_card(filters=None):
+	"""Number Card (Custom) source: this month's overtime cost from the summary table"""
+	return _get_card_value('overtime_amount', filters)
+
+
+@frappe.whitelist()
+def get_deduction_total_card(filters=None):
+	"""Number Card (Custom) source: this month's attendance deductions from the summary table"""
+	return _get_card_value('deduction_amount', filters)
+
+
+def _get_card_value(fieldname, filters):
+	filters = frappe.parse_json(filters) or {}
+	filters['period'] = get_first_day(filters.get('period') or today())
+
+	value = frappe.get_list(
+		'Attendance Cost Summary',
+		filters=filters,
+		fields=[f'sum({fieldname}) as total']
+	)[0].total
+
+	return {
+		'value': value or 0,
+		'fieldtype': 'Currency',
+		'route': ['List', 'Attendance Cost Summary'],
+		'route_options': {'period': filters['period']}
+	}
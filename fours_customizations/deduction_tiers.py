@@ -0,0 +1,114 @@
+"""
+Graduated attendance deductions for Fours Customizations
+Prices the Nth occurrence of a violation in a period by the designation's deduction tiers
+"""
+
+from fours_customizations.money import MULTIPLIER_SCALE, div_round, to_scaled_multiplier
+
+# Designation Deduction Tier violation type -> violation key used by the handler
+VIOLATION_TYPE_KEYS = {
+	'Absent': 'absent',
+	'Late': 'late',
+	'Early Exit': 'early_exit',
+	'No Checkout': 'no_checkout'
+}
+
+
+def compile_deduction_tiers(tiers):
+	"""
+	Group Designation Deduction Tier rows by violation key.
+
+	Returns:
+		dict: Violation key -> sorted list of (from_occurrence, to_occurrence or None, scaled multiplier)
+	"""
+	compiled = {}
+
+	for tier in tiers or []:
+		key = VIOLATION_TYPE_KEYS.get(tier.get('violation_type'))
+		if not key:
+			continue
+
+		compiled.setdefault(key, []).append((
+			max(int(tier.get('from_occurrence') or 1), 1),
+			int(tier.get('to_occurrence') or 0) or None,
+			to_scaled_multiplier(tier.get('rate_multiplier'))
+		))
+
+	for key in compiled:
+		compiled[key].sort()
+
+	return compiled
+
+
+def price_occurrences(count, rate_minor, tiers=None):
+	"""
+	Price `count` occurrences of a violation in minor units.
+
+	An occurrence's price depends only on its rank in the period, so ranking the rows and
+	bucketing them by tier reduces to overlapping each tier's [from, to] range with
+	[1, count]. Cost is per tier, not per attendance row. Occurrences outside every tier
+	are charged the base rate; where tiers overlap the earlier one wins.
+
+	Args:
+		count (int): Number of occurrences in the period
+		rate_minor (int): Base deduction rate in minor units
+		tiers (list): Compiled tiers for this violation type
+
+	Returns:
+		int: Deduction amount in minor units
+	"""
+	if not tiers:
+		return count * rate_minor
+
+	scaled_occurrences = 0
+	covered = 0
+	next_unpriced = 1
+
+	for from_occurrence, to_occurrence, multiplier in tiers:
+		low = max(from_occurrence, next_unpriced)
+		high = min(to_occurrence or count, count)
+
+		if high < low:
+			continue
+
+		scaled_occurrences += (high - low + 1) * multiplier
+		covered += high - low + 1
+		next_unpriced = high + 1
+
+	scaled_occurrences += (count - covered) * MULTIPLIER_SCALE
+
+	return div_round(scaled_occurrences * rate_minor, MULTIPLIER_SCALE)
+
+
+def price_dated_occurrences(rates_minor, tiers=None):
+	"""
+	Price occurrences whose base rate can change within the period.
+
+	Each occurrence is charged its tier multiplier times the rate in effect on its day.
+	When every occurrence has the same rate this is price_occurrences.
+
+	Args:
+		rates_minor (list): Base rate in minor units of each occurrence, in date order
+		tiers (list): Compiled tiers for this violation type
+
+	Returns:
+		int: Deduction amount in minor units
+	"""
+	if len(set(rates_minor)) <= 1:
+		return price_occurrences(len(rates_minor), rates_minor[0] if rates_minor else 0, tiers)
+
+	scaled = sum(
+		_get_occurrence_multiplier(rank, tiers) * rate_minor
+		for rank, rate_minor in enumerate(rates_minor, 1)
+	)
+
+	return div_round(scaled, MULTIPLIER_SCALE)
+
+
+def _get_occurrence_multiplier(rank, tiers):
+	"""Scaled multiplier of the Nth occurrence; the earliest matching tier wins, as in price_occurrences"""
+	for from_occurrence, to_occurrence, multiplier in tiers or []:
+		if from_occurrence <= rank and (to_occurrence is None or rank <= to_occurrence):
+			return multiplier
+
+	return MULTIPLIER_SCALE
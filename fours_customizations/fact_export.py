@@ -0,0 +1,167 @@
+"""
+Columnar export of attendance-derived payroll facts for Fours Customizations
+Streams one row per employee per attendance day into Arrow IPC or Parquet record batches
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate
+
+from fours_customizations.attendance_flags import derive_flags, get_shift_windows
+from fours_customizations.attendance_query import iter_attendance_with_policy, iter_employee_groups
+from fours_customizations.overtime_utils import apply_monthly_cap, price_overtime_day
+from fours_customizations.policy import has_overtime_policy
+from fours_customizations.replica import use_read_replica
+from fours_customizations.shift_schedule import get_scheduled_shift, load_shift_schedule
+
+try:
+	import pyarrow
+except ImportError:
+	# Optional: only needed for the export
+	pyarrow = None
+
+FORMAT_ARROW = 'arrow'
+FORMAT_PARQUET = 'parquet'
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def get_fact_schema():
+	"""Arrow schema of the exported facts"""
+	return pyarrow.schema([
+		('attendance', pyarrow.string()),
+		('employee', pyarrow.string()),
+		('designation', pyarrow.string()),
+		('date', pyarrow.date32()),
+		('status', pyarrow.string()),
+		('late_entry', pyarrow.bool_()),
+		('early_exit', pyarrow.bool_()),
+		('no_checkout', pyarrow.bool_()),
+		('overtime_hours', pyarrow.float64()),
+		('overtime_amount', pyarrow.float64()),
+		('overtime_amount_minor', pyarrow.int64()),
+		('overtime_capped', pyarrow.bool_())
+	])
+
+
+@use_read_replica
+def export_payroll_facts(start_date, end_date, path, file_format=FORMAT_PARQUET, company=None, batch_size=None):
+	"""
+	Write a period's per-employee, per-day attendance and overtime facts to a file.
+
+	Rows are produced from the keyset-paginated attendance stream and flushed every
+	`batch_size` rows as one record batch, so memory stays flat however long the period.
+	Arrow IPC files can be memory-mapped directly by analysts.
+
+	Args:
+		start_date (str/date): Start date of the period
+		end_date (str/date): End date of the period
+		path (str): Output file
+		file_format (str): 'parquet' or 'arrow' (Arrow IPC file format)
+		company (str): Optional company to restrict to
+		batch_size (int): Rows per record batch
+
+	Returns:
+		dict: {'path', 'rows', 'batches'}
+	"""
+	if pyarrow is None:
+		frappe.throw(_('pyarrow is required to export payroll facts. Install it with: bench pip install pyarrow'))
+
+	if file_format not in [FORMAT_ARROW, FORMAT_PARQUET]:
+		frappe.throw(_('Unsupported export format: {0}').format(file_format))
+
+	batch_size = cint(batch_size) or DEFAULT_BATCH_SIZE
+	schema = get_fact_schema()
+	writer = _open_writer(path, schema, file_format)
+
+	rows = batches = 0
+	columns = _empty_columns(schema)
+
+	try:
+		for fact in iter_payroll_facts(start_date, end_date, company=company):
+			for fieldname, value in fact.items():
+				columns[fieldname].append(value)
+
+			if len(columns['attendance']) >= batch_size:
+				_write_batch(writer, columns, schema, file_format)
+				rows += len(columns['attendance'])
+				batches += 1
+				columns = _empty_columns(schema)
+
+		if columns['attendance']:
+			_write_batch(writer, columns, schema, file_format)
+			rows += len(columns['attendance'])
+			batches += 1
+	finally:
+		writer.close()
+
+	return {'path': path, 'rows': rows, 'batches': batches}
+
+
+def iter_payroll_facts(start_date, end_date, company=None):
+	"""
+	Stream one fact per submitted attendance row in the period.
+
+	Yields:
+		dict: Keyed by the fact schema's field names
+	"""
+	filters = {'company': company} if company else {}
+	employees = frappe.get_all('Employee', filters=filters, pluck='name', order_by='name')
+	shift_windows = None
+
+	for group in iter_employee_groups(employees):
+		shift_schedule = load_shift_schedule(group, start_date, end_date)
+		# Per-employee monthly cap totals; rows arrive in date order
+		running_totals = {}
+
+		for att, policy in iter_attendance_with_policy(
+			group,
+			start_date,
+			end_date,
+			fields=['employee', 'status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit']
+		):
+			if policy.derive_attendance_flags:
+				shift_windows = shift_windows if shift_windows is not None else get_shift_windows()
+				derive_flags(att, shift_windows, policy.default_shift, get_scheduled_shift(shift_schedule, att.employee, att.attendance_date))
+
+			present = att.status in ['Present', 'Half Day']
+			overtime = price_overtime_day(policy, att, shift_schedule) if present and has_overtime_policy(policy) else None
+			if overtime:
+				overtime = apply_monthly_cap(policy, overtime, running_totals.setdefault(att.employee, {}))
+
+			yield {
+				'attendance': att.name,
+				'employee': att.employee,
+				'designation': policy.designation,
+				'date': getdate(att.attendance_date),
+				'status': att.status,
+				'late_entry': bool(att.late_entry),
+				'early_exit': bool(att.early_exit),
+				'no_checkout': present and not att.out_time,
+				'overtime_hours': overtime['overtime_hours'] if overtime else 0.0,
+				'overtime_amount': overtime['overtime_amount'] if overtime else 0.0,
+				'overtime_amount_minor': overtime['overtime_amount_minor'] if overtime else 0,
+				'overtime_capped': overtime['monthly_capped'] if overtime else False
+			}
+
+
+def _open_writer(path, schema, file_format):
+	if file_format == FORMAT_ARROW:
+		import pyarrow.ipc
+		return pyarrow.ipc.new_file(path, schema)
+
+	import pyarrow.parquet
+	return pyarrow.parquet.ParquetWriter(path, schema)
+
+
+def _empty_columns(schema):
+	return {fieldname: [] for fieldname in schema.names}
+
+
+def _write_batch(writer, columns, schema, file_format):
+	batch = pyarrow.RecordBatch.from_pydict(columns, schema=schema)
+
+	if file_format == FORMAT_ARROW:
+		writer.write_batch(batch)
+	else:
+		writer.write_table(pyarrow.Table.from_batches([batch], schema=schema))
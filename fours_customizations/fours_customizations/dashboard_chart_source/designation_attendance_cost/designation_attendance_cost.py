@@ -0,0 +1,32 @@
+# Copyright (c) 2025, Frappe and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import get_first_day, nowdate
+
+
+@frappe.whitelist()
+def get(chart_name=None, chart=None, no_cache=None, filters=None, from_date=None, to_date=None, timespan=None, time_interval=None, heatmap_year=None):
+	"""Overtime and deduction totals per designation for one month, read from Attendance Cost Summary"""
+	filters = frappe.parse_json(filters) or {}
+
+	summary_filters = {'period': get_first_day(filters.get('period') or nowdate())}
+	if filters.get('company'):
+		summary_filters['company'] = filters['company']
+
+	rows = frappe.get_list(
+		'Attendance Cost Summary',
+		filters=summary_filters,
+		fields=['designation', 'sum(overtime_amount) as overtime_amount', 'sum(deduction_amount) as deduction_amount'],
+		group_by='designation',
+		order_by='designation'
+	)
+
+	return {
+		'labels': [row.designation or _('Not Set') for row in rows],
+		'datasets': [
+			{'name': _('Overtime'), 'values': [row.overtime_amount for row in rows]},
+			{'name': _('Deductions'), 'values': [row.deduction_amount for row in rows]}
+		]
+	}
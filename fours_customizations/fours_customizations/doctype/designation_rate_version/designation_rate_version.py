@@ -0,0 +1,8 @@
+# Copyright (c) 2025, Frappe and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class DesignationRateVersion(Document):
+	pass
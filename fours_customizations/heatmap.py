@@ -0,0 +1,93 @@
+"""
+Attendance heatmap for Fours Customizations
+One bitmask per employee per violation type, packed as base64, for supervisor grids
+"""
+
+import base64
+
+import frappe
+from frappe import _
+from frappe.utils import date_diff, getdate
+
+from fours_customizations.attendance_query import iter_attendance
+from fours_customizations.leave_calendar import get_leave_dates
+from fours_customizations.policy import resolve_policy
+from fours_customizations.replica import use_read_replica
+from fours_customizations.salary_slip_handler import VIOLATION_TYPES, classify_attendance
+from fours_customizations.shift_schedule import load_shift_schedule
+
+MAX_DAYS = 366
+
+
+@frappe.whitelist()
+@use_read_replica
+def get_attendance_heatmap(department, start_date, end_date):
+	"""
+	Get a department's violations as one bitmask per employee and violation type.
+
+	Bit N of a mask (least significant bit of the first byte first) is set when the
+	employee has that violation on day N of the period (0 = start_date). Masks are
+	little-endian bytes, base64 encoded, so a 31-day period is 8 characters per mask.
+	Violations follow the same rules as the slips, including derived flags and excused
+	absences. Employees are limited to those the user can read.
+
+	Args:
+		department (str): Department
+		start_date (str/date): First day of the grid
+		end_date (str/date): Last day of the grid
+
+	Returns:
+		dict: {
+			'start_date', 'days', 'types': violation keys in mask order,
+			'employees': [[employee, employee_name, [mask per type]]]
+		}
+	"""
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	days = date_diff(end_date, start_date) + 1
+
+	if days < 1 or days > MAX_DAYS:
+		frappe.throw(_('The heatmap period must be between 1 and {0} days').format(MAX_DAYS))
+
+	employees = frappe.get_list(
+		'Employee',
+		filters={'department': department},
+		fields=['name', 'employee_name'],
+		order_by='name',
+		limit_page_length=0
+	)
+	names = [emp.name for emp in employees]
+
+	types = list(VIOLATION_TYPES)
+	masks = {name: [0] * len(types) for name in names}
+	leave_dates = get_leave_dates(names, start_date, end_date)
+	shift_schedule = load_shift_schedule(names, start_date, end_date)
+	policies = {}
+
+	for att in iter_attendance(
+		names,
+		start_date,
+		end_date,
+		fields=['employee', 'status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit']
+	):
+		policy = policies.get(att.employee)
+		if policy is None:
+			policy = policies[att.employee] = resolve_policy(att.employee)
+
+		bit = 1 << date_diff(att.attendance_date, start_date)
+
+		for key in classify_attendance(policy, att, leave_dates.get(att.employee, set()), shift_schedule=shift_schedule):
+			masks[att.employee][types.index(key)] |= bit
+
+	return {
+		'start_date': start_date,
+		'days': days,
+		'types': types,
+		'employees': [
+			[emp.name, emp.employee_name, [_pack(mask, days) for mask in masks[emp.name]]]
+			for emp in employees
+		]
+	}
+
+
+def _pack(mask, days):
+	return base64.b64encode(mask.to_bytes((days + 7) // 8, 'little')).decode()
@@ -0,0 +1,108 @@
+"""
+Compiled holiday calendars for Fours Customizations
+Each Holiday List is compiled once per year into day-of-year bitmaps and cached in Redis
+"""
+
+from datetime import date
+
+import frappe
+from frappe.utils import getdate
+
+from fours_customizations.replica import on_replica
+
+CACHE_KEY = 'fours_holiday_calendar'
+
+DAY_TYPE_WORKING = 'Working Day'
+DAY_TYPE_HOLIDAY = 'Holiday'
+DAY_TYPE_WEEKLY_OFF = 'Weekly Off'
+
+
+def get_year_bitmaps(holiday_list, year):
+	"""
+	Get the compiled (holiday_bits, weekly_off_bits) for a holiday list and year.
+
+	Bit N is set when day N of the year (0 = 1st January) is a holiday / weekly off.
+	The year is compiled with a single query the first time it is requested.
+
+	Returns:
+		tuple: (int, int)
+	"""
+	calendar = frappe.cache().hget(CACHE_KEY, holiday_list) or {}
+
+	if year not in calendar:
+		calendar[year] = _compile_year(holiday_list, year)
+		# Replica reads may lag behind the invalidation hooks, so don't cache them
+		if not on_replica():
+			frappe.cache().hset(CACHE_KEY, holiday_list, calendar)
+
+	return calendar[year]
+
+
+def _compile_year(holiday_list, year):
+	"""Build the holiday and weekly off bitmaps for one year of a holiday list"""
+	holidays = frappe.get_all(
+		'Holiday',
+		filters={
+			'parent': holiday_list,
+			'parenttype': 'Holiday List',
+			'holiday_date': ['between', [date(year, 1, 1), date(year, 12, 31)]]
+		},
+		fields=['holiday_date', 'weekly_off']
+	)
+
+	year_start = date(year, 1, 1).toordinal()
+	holiday_bits = 0
+	weekly_off_bits = 0
+
+	for holiday in holidays:
+		bit = 1 << (getdate(holiday.holiday_date).toordinal() - year_start)
+		if holiday.weekly_off:
+			weekly_off_bits |= bit
+		else:
+			holiday_bits |= bit
+
+	return (holiday_bits, weekly_off_bits)
+
+
+def get_day_type(holiday_list, attendance_date):
+	"""
+	Classify a date against a holiday list with a constant-time bit test.
+
+	Returns:
+		str: DAY_TYPE_WEEKLY_OFF, DAY_TYPE_HOLIDAY or DAY_TYPE_WORKING
+	"""
+	if not holiday_list:
+		return DAY_TYPE_WORKING
+
+	date_obj = getdate(attendance_date)
+	holiday_bits, weekly_off_bits = get_year_bitmaps(holiday_list, date_obj.year)
+	bit = 1 << (date_obj.toordinal() - date(date_obj.year, 1, 1).toordinal())
+
+	if weekly_off_bits & bit:
+		return DAY_TYPE_WEEKLY_OFF
+
+	if holiday_bits & bit:
+		return DAY_TYPE_HOLIDAY
+
+	return DAY_TYPE_WORKING
+
+
+def get_overtime_multiplier(day_type, policy):
+	"""
+	Get the overtime rate multiplier for a day type from the resolved attendance policy.
+
+	Returns:
+		float: Multiplier applied to the overtime hourly rate
+	"""
+	if day_type == DAY_TYPE_WEEKLY_OFF:
+		return policy.get('weekly_off_overtime_multiplier') or 1
+
+	if day_type == DAY_TYPE_HOLIDAY:
+		return policy.get('holiday_overtime_multiplier') or 1
+
+	return 1
+
+
+def invalidate_holiday_calendar(doc, method=None):
+	"""Drop the compiled calendar when a Holiday List is changed or deleted"""
+	frappe.cache().hdel(CACHE_KEY, doc.name)
@@ -8,7 +8,7 @@ app_license = "mit"
 # Apps
 # ------------------
 
-# required_apps = []
+required_apps = ["hrms"]
 
 # Each item in the list will be shown as an app in the apps page
 # add_to_apps_screen = [
@@ -79,11 +79,18 @@ app_license = "mit"
 # 	"filters": "fours_customizations.utils.jinja_filters"
 # }
 
+jinja = {
+	"methods": [
+		"fours_customizations.slip_snapshot.get_attendance_snapshot"
+	]
+}
+
 # Installation
 # ------------
 
 # before_install = "fours_customizations.install.before_install"
 after_install = "fours_customizations.install.after_install"
+after_migrate = "fours_customizations.install.after_migrate"
 
 # Uninstallation
 # ------------
@@ -129,18 +136,113 @@ after_install = "fours_customizations.install.after_install"
 # ---------------
 # Override standard doctype classes
 
-# override_doctype_class = {
-# 	"ToDo": "custom_app.overrides.CustomToDo"
-# }
+override_doctype_class = {
+	"Salary Slip": "fours_customizations.overrides.FoursSalarySlip"
+}
 
 # Document Events
 # ---------------
 # Hook on document methods and events
 
 doc_events = {
-	"Salary Slip": {
-		"before_save": "fours_customizations.salary_slip_handler.calculate_and_add_deductions",
-		"before_insert": "fours_customizations.salary_slip_handler.calculate_and_add_deductions"
+	"Employee": {
+		"on_update": [
+			"fours_customizations.policy.invalidate_employee_policy",
+			"fours_customizations.self_service.invalidate_employee_accumulators",
+			"fours_customizations.rolling_counters.invalidate_employee_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		],
+		"on_trash": [
+			"fours_customizations.policy.invalidate_employee_policy",
+			"fours_customizations.self_service.invalidate_employee_accumulators",
+			"fours_customizations.rolling_counters.invalidate_employee_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		]
+	},
+	"Designation": {
+		"on_update": [
+			"fours_customizations.policy.invalidate_all_policies",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		],
+		"on_trash": [
+			"fours_customizations.policy.invalidate_all_policies",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		]
+	},
+	"Department": {
+		"on_update": [
+			"fours_customizations.policy.invalidate_all_policies",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		],
+		"on_trash": [
+			"fours_customizations.policy.invalidate_all_policies",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		]
+	},
+	"Company": {
+		"on_update": [
+			"fours_customizations.policy.invalidate_all_policies",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		]
+	},
+	"Attendance": {
+		"on_submit": [
+			"fours_customizations.attendance_sync.on_attendance_change",
+			"fours_customizations.self_service.update_accumulator",
+			"fours_customizations.rolling_counters.update_counters"
+		],
+		"on_cancel": [
+			"fours_customizations.attendance_sync.on_attendance_change",
+			"fours_customizations.self_service.update_accumulator",
+			"fours_customizations.rolling_counters.update_counters"
+		]
+	},
+	"Leave Application": {
+		"on_submit": "fours_customizations.leave_calendar.on_leave_change",
+		"on_cancel": "fours_customizations.leave_calendar.on_leave_change"
+	},
+	"Shift Assignment": {
+		"on_submit": "fours_customizations.shift_schedule.on_shift_assignment_change",
+		"on_cancel": "fours_customizations.shift_schedule.on_shift_assignment_change",
+		"on_update_after_submit": "fours_customizations.shift_schedule.on_shift_assignment_change"
+	},
+	"Shift Type": {
+		"on_update": [
+			"fours_customizations.attendance_flags.invalidate_shift_windows",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		],
+		"on_trash": [
+			"fours_customizations.attendance_flags.invalidate_shift_windows",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		]
+	},
+	"Holiday List": {
+		"on_update": [
+			"fours_customizations.holiday_calendar.invalidate_holiday_calendar",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		],
+		"on_trash": [
+			"fours_customizations.holiday_calendar.invalidate_holiday_calendar",
+			"fours_customizations.self_service.invalidate_all_accumulators",
+			"fours_customizations.rolling_counters.invalidate_all_counters",
+			"fours_customizations.cost_summary.mark_current_month_dirty"
+		]
 	}
 }
 
@@ -165,6 +267,17 @@ doc_events = {
 # 	],
 # }
 
+scheduler_events = {
+	"cron": {
+		"* * * * *": [
+			"fours_customizations.attendance_sync.refresh_dirty_slips"
+		]
+	},
+	"hourly": [
+		"fours_customizations.cost_summary.update_cost_summaries"
+	]
+}
+
 # Testing
 # -------
 
@@ -5,9 +5,24 @@ from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 def after_install():
 	"""Create custom fields for Designation doctype after app installation"""
 	create_designation_custom_fields()
+	create_policy_override_fields()
+	create_salary_slip_custom_fields()
 	create_salary_components()
 
 
+def after_migrate():
+	"""Keep custom fields in sync with the app on every migrate"""
+	create_designation_custom_fields()
+	create_policy_override_fields()
+	create_salary_slip_custom_fields()
+	# Components added by later versions, e.g. Rolling Violation Penalty on existing sites
+	create_salary_components()
+
+	# Cached policies may predate fields added by this version
+	from fours_customizations.policy import invalidate_all_policies
+	invalidate_all_policies()
+
+
 def create_designation_custom_fields():
 	"""Add attendance deduction fields to Designation doctype"""
 
@@ -74,12 +89,76 @@ def create_designation_custom_fields():
 				"description": "Amount to deduct when employee doesn't checkout",
 				"precision": 2,
 			},
+			{
+				"fieldname": "derive_attendance_flags",
+				"label": "Derive Late / Early Flags From Shift",
+				"fieldtype": "Check",
+				"insert_after": "no_checkout_deduction",
+				"description": "When Attendance has no Late Entry / Early Exit flag (e.g., device imports), classify it from In / Out Time against the shift start / end and grace periods",
+			},
+			{
+				"fieldname": "deduction_tiers_section",
+				"label": "Graduated Deductions",
+				"fieldtype": "Section Break",
+				"insert_after": "derive_attendance_flags",
+				"collapsible": 1,
+			},
+			{
+				"fieldname": "deduction_tiers",
+				"label": "Deduction Tiers",
+				"fieldtype": "Table",
+				"options": "Designation Deduction Tier",
+				"insert_after": "deduction_tiers_section",
+				"description": "Optional escalation by occurrence within the payroll period, e.g. Late 1-2 at 0 (free), 3-5 at 1, 6+ at 2. Occurrences not covered by a tier use the base rate.",
+			},
+			{
+				"fieldname": "rolling_violation_section",
+				"label": "Rolling Window Penalty",
+				"fieldtype": "Section Break",
+				"insert_after": "deduction_tiers",
+				"collapsible": 1,
+			},
+			{
+				"fieldname": "rolling_violation_type",
+				"label": "Violation Type",
+				"fieldtype": "Select",
+				"options": "\nAbsent\nLate\nEarly Exit\nNo Checkout",
+				"insert_after": "rolling_violation_section",
+				"description": "Violation counted across payroll periods in the trailing window ending on the slip's end date",
+			},
+			{
+				"fieldname": "rolling_window_days",
+				"label": "Window (Days)",
+				"fieldtype": "Int",
+				"insert_after": "rolling_violation_type",
+				"description": "Length of the trailing window, e.g. 30",
+			},
+			{
+				"fieldname": "column_break_rolling",
+				"fieldtype": "Column Break",
+				"insert_after": "rolling_window_days",
+			},
+			{
+				"fieldname": "rolling_violation_threshold",
+				"label": "Threshold",
+				"fieldtype": "Int",
+				"insert_after": "column_break_rolling",
+				"description": "Penalty applies when the count in the window is more than this",
+			},
+			{
+				"fieldname": "rolling_violation_penalty",
+				"label": "Penalty",
+				"fieldtype": "Currency",
+				"insert_after": "rolling_violation_threshold",
+				"description": "Extra deduction added once to the slip when the threshold is exceeded",
+				"precision": 2,
+			},
 			# Overtime Configuration Section
 			{
 				"fieldname": "overtime_configuration_section",
 				"label": "Overtime Configuration",
 				"fieldtype": "Section Break",
-				"insert_after": "no_checkout_deduction",
+				"insert_after": "rolling_violation_penalty",
 				"collapsible": 1,
 			},
 			{
@@ -108,10 +187,17 @@ def create_designation_custom_fields():
 				"insert_after": "column_break_overtime",
 				"description": "Maximum time for overtime calculation (e.g., 22:00:00 for 10:00 PM). Work beyond this time will not be paid.",
 			},
+			{
+				"fieldname": "overtime_from_shift_end",
+				"label": "Start Overtime at Shift End",
+				"fieldtype": "Check",
+				"insert_after": "overtime_end_time",
+				"description": "Start overtime when the shift assigned that day ends, for rotating shifts. The window keeps the length and tiers set above. Days without a shift use the fixed times.",
+			},
 			{
 				"fieldname": "section_break_overtime_2",
 				"fieldtype": "Section Break",
-				"insert_after": "overtime_end_time",
+				"insert_after": "overtime_from_shift_end",
 			},
 			{
 				"fieldname": "overtime_hourly_rate",
@@ -121,6 +207,60 @@ def create_designation_custom_fields():
 				"description": "Amount to pay per hour of overtime worked",
 				"precision": 2,
 			},
+			{
+				"fieldname": "column_break_overtime_2",
+				"fieldtype": "Column Break",
+				"insert_after": "overtime_hourly_rate",
+			},
+			{
+				"fieldname": "holiday_overtime_multiplier",
+				"label": "Holiday Overtime Multiplier",
+				"fieldtype": "Float",
+				"insert_after": "column_break_overtime_2",
+				"description": "Overtime rate multiplier on holidays from the employee's Holiday List (e.g., 2 for double pay). Leave empty to inherit from the Department or Company; 1 when unset everywhere.",
+			},
+			{
+				"fieldname": "weekly_off_overtime_multiplier",
+				"label": "Weekly Off Overtime Multiplier",
+				"fieldtype": "Float",
+				"insert_after": "holiday_overtime_multiplier",
+				"description": "Overtime rate multiplier on weekly offs from the employee's Holiday List. Leave empty to inherit from the Department or Company; 1 when unset everywhere.",
+			},
+			{
+				"fieldname": "monthly_overtime_hour_cap",
+				"label": "Monthly Overtime Hour Cap",
+				"fieldtype": "Float",
+				"insert_after": "weekly_off_overtime_multiplier",
+				"description": "Maximum paid overtime hours per calendar month. Overtime past the cap is not paid and the days are flagged. Leave empty for no cap.",
+			},
+			{
+				"fieldname": "section_break_overtime_tiers",
+				"fieldtype": "Section Break",
+				"insert_after": "monthly_overtime_hour_cap",
+			},
+			{
+				"fieldname": "overtime_tiers",
+				"label": "Overtime Tiers",
+				"fieldtype": "Table",
+				"options": "Designation Overtime Tier",
+				"insert_after": "section_break_overtime_tiers",
+				"description": "Optional higher rates later in the overtime window (e.g., 1.5 from 17:00, 2 from 20:00, 3 from 00:00). Without tiers the whole window is paid at the hourly rate.",
+			},
+			{
+				"fieldname": "rate_versions_section",
+				"label": "Rate History",
+				"fieldtype": "Section Break",
+				"insert_after": "overtime_tiers",
+				"collapsible": 1,
+			},
+			{
+				"fieldname": "rate_versions",
+				"label": "Rate Versions",
+				"fieldtype": "Table",
+				"options": "Designation Rate Version",
+				"insert_after": "rate_versions_section",
+				"description": "Rates that apply from a date on, so a change mid-period only affects attendance from that date. Days before the first row use the rates above; an empty rate in a row keeps the previous row's rate unless the row's Empty Rates is Set to Zero.",
+			},
 		]
 	}
 
@@ -130,6 +270,115 @@ def create_designation_custom_fields():
 	print("Custom fields added to Designation doctype successfully!")
 
 
+def create_policy_override_fields():
+	"""Add optional attendance policy overrides to Employee, Department and Company"""
+
+	custom_fields = {
+		"Employee": get_policy_override_fields(
+			"holiday_list",
+			"Overrides the Designation, Department and Company values for this employee. Leave empty to inherit.",
+		),
+		"Department": get_policy_override_fields(
+			"leave_block_list",
+			"Used for employees whose Employee record and Designation leave the value empty.",
+		),
+		"Company": get_policy_override_fields(
+			"default_holiday_list",
+			"Company-wide fallback used when no Employee, Designation or Department value is set.",
+		),
+	}
+
+	create_custom_fields(custom_fields, update=True)
+	frappe.db.commit()
+
+	print("Attendance policy override fields added successfully!")
+
+
+def get_policy_override_fields(insert_after, note):
+	"""Build the attendance policy override fields for one level of the hierarchy"""
+
+	fields = [
+		{
+			"fieldname": "attendance_policy_section",
+			"label": "Attendance Policy Overrides",
+			"fieldtype": "Section Break",
+			"insert_after": insert_after,
+			"collapsible": 1,
+		},
+		{
+			"fieldname": "attendance_policy_note",
+			"label": "Note",
+			"fieldtype": "HTML",
+			"insert_after": "attendance_policy_section",
+			"options": f"<p style='color: #888;'>{note}</p>",
+		},
+	]
+
+	policy_fields = [
+		("absent_deduction", "Absent Deduction", "Currency"),
+		("late_deduction", "Late Deduction", "Currency"),
+		("early_exit_deduction", "Early Exit Deduction", "Currency"),
+		("no_checkout_deduction", "Employee Doesn't Checkout Deduction", "Currency"),
+		("derive_attendance_flags", "Derive Late / Early Flags From Shift", "Check"),
+		("column_break_attendance_policy", None, "Column Break"),
+		("overtime_start_time", "Overtime Start Time", "Time"),
+		("overtime_end_time", "Overtime End Time", "Time"),
+		("overtime_from_shift_end", "Start Overtime at Shift End", "Check"),
+		("overtime_hourly_rate", "Overtime Hourly Rate", "Currency"),
+		("holiday_overtime_multiplier", "Holiday Overtime Multiplier", "Float"),
+		("weekly_off_overtime_multiplier", "Weekly Off Overtime Multiplier", "Float"),
+		("monthly_overtime_hour_cap", "Monthly Overtime Hour Cap", "Float"),
+		("column_break_attendance_policy_2", None, "Column Break"),
+		("rolling_violation_type", "Rolling Window Violation Type", "Select"),
+		("rolling_window_days", "Rolling Window (Days)", "Int"),
+		("rolling_violation_threshold", "Rolling Window Threshold", "Int"),
+		("rolling_violation_penalty", "Rolling Window Penalty", "Currency"),
+	]
+
+	previous = "attendance_policy_note"
+	for fieldname, label, fieldtype in policy_fields:
+		field = {
+			"fieldname": fieldname,
+			"fieldtype": fieldtype,
+			"insert_after": previous,
+		}
+		if label:
+			field["label"] = label
+		if fieldtype == "Currency":
+			field["precision"] = 2
+		if fieldtype == "Select":
+			field["options"] = "\nAbsent\nLate\nEarly Exit\nNo Checkout"
+		fields.append(field)
+		previous = fieldname
+
+	return fields
+
+
+def create_salary_slip_custom_fields():
+	"""Add the attendance computation snapshot field to Salary Slip"""
+
+	custom_fields = {
+		"Salary Slip": [
+			{
+				"fieldname": "attendance_snapshot",
+				"label": "Attendance Snapshot",
+				"fieldtype": "JSON",
+				"insert_after": "net_pay",
+				"hidden": 1,
+				"read_only": 1,
+				"no_copy": 1,
+				"print_hide": 1,
+				"description": "Attendance deductions and overtime breakdown stored when the slip was last calculated",
+			},
+		]
+	}
+
+	create_custom_fields(custom_fields, update=True)
+	frappe.db.commit()
+
+	print("Custom fields added to Salary Slip doctype successfully!")
+
+
 def create_salary_components():
 	"""Create salary components for attendance deductions and overtime"""
 
@@ -154,6 +403,11 @@ def create_salary_components():
 			'description': 'Deduction when employee does not checkout based on designation rate',
 			'type': 'Deduction'
 		},
+		{
+			'salary_component': 'Rolling Violation Penalty',
+			'description': 'Penalty when violations in a trailing window exceed the designation threshold',
+			'type': 'Deduction'
+		},
 		{
 			'salary_component': 'Designation Overtime Pay',
 			'description': 'Overtime payment based on designation overtime rate',
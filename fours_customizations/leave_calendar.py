@@ -0,0 +1,128 @@
+"""
+Approved leave lookups for Fours Customizations
+Absences on approved leave or on a holiday are not deducted; leave is read with one range query
+"""
+
+import frappe
+from frappe.utils import add_days, date_diff, getdate
+
+from fours_customizations.holiday_calendar import DAY_TYPE_WORKING, get_day_type
+
+
+def get_leave_dates(employees, start_date, end_date):
+	"""
+	Get the dates covered by approved Leave Applications, with one query for all employees.
+
+	The half day of a half-day leave is not covered, since the other half is still expected.
+
+	Returns:
+		dict: Employee ID -> set of dates within the period
+	"""
+	if not employees:
+		return {}
+
+	LeaveApplication = frappe.qb.DocType('Leave Application')
+	query = _leave_query(LeaveApplication, start_date, end_date).where(LeaveApplication.employee.isin(employees))
+
+	return _expand(query.run(as_dict=True), start_date, end_date)
+
+
+def get_slip_leave_dates(doc):
+	"""
+	Get the leave dates of a Salary Slip's employee and period.
+
+	While a Payroll Entry creates or submits its slips (HRMS sets `via_payroll_entry`),
+	the slips share one join of Leave Application with the entry's employees, loaded on
+	the first slip and kept for the rest of the job. A single slip saved on its own, from
+	the form or a refresh, reads only its employee's leave.
+	"""
+	if not (doc.payroll_entry and frappe.flags.via_payroll_entry):
+		return get_leave_dates([doc.employee], doc.start_date, doc.end_date).get(doc.employee, set())
+
+	if not hasattr(frappe.local, 'fours_payroll_leave_dates'):
+		frappe.local.fours_payroll_leave_dates = {}
+
+	key = (doc.payroll_entry, str(getdate(doc.start_date)), str(getdate(doc.end_date)))
+	if key not in frappe.local.fours_payroll_leave_dates:
+		frappe.local.fours_payroll_leave_dates[key] = _get_payroll_entry_leave_dates(doc.payroll_entry, doc.start_date, doc.end_date)
+
+	return frappe.local.fours_payroll_leave_dates[key].get(doc.employee, set())
+
+
+def _get_payroll_entry_leave_dates(payroll_entry, start_date, end_date):
+	LeaveApplication = frappe.qb.DocType('Leave Application')
+	PayrollEmployee = frappe.qb.DocType('Payroll Employee Detail')
+
+	query = (
+		_leave_query(LeaveApplication, start_date, end_date)
+		.join(PayrollEmployee)
+		.on(PayrollEmployee.employee == LeaveApplication.employee)
+		.where(PayrollEmployee.parent == payroll_entry)
+		.where(PayrollEmployee.parenttype == 'Payroll Entry')
+	)
+
+	return _expand(query.run(as_dict=True), start_date, end_date)
+
+
+def _leave_query(LeaveApplication, start_date, end_date):
+	"""Approved, submitted leave overlapping the period"""
+	return (
+		frappe.qb.from_(LeaveApplication)
+		.select(
+			LeaveApplication.employee,
+			LeaveApplication.from_date,
+			LeaveApplication.to_date,
+			LeaveApplication.half_day,
+			LeaveApplication.half_day_date
+		)
+		.where(LeaveApplication.docstatus == 1)
+		.where(LeaveApplication.status == 'Approved')
+		.where(LeaveApplication.from_date <= end_date)
+		.where(LeaveApplication.to_date >= start_date)
+	)
+
+
+def _expand(leaves, start_date, end_date):
+	"""Turn leave ranges into per-employee date sets clipped to the period"""
+	start_date, end_date = getdate(start_date), getdate(end_date)
+	dates = {}
+
+	for leave in leaves:
+		first = max(getdate(leave.from_date), start_date)
+		last = min(getdate(leave.to_date), end_date)
+		half_day_date = getdate(leave.half_day_date) if leave.half_day and leave.half_day_date else None
+
+		covered = dates.setdefault(leave.employee, set())
+		for offset in range(date_diff(last, first) + 1):
+			day = add_days(first, offset)
+			if day != half_day_date:
+				covered.add(day)
+
+	return dates
+
+
+def is_excused_absence(policy, att, leave_dates):
+	"""Check whether an Absent row falls on approved leave or on a holiday / weekly off"""
+	attendance_date = getdate(att.attendance_date)
+
+	if attendance_date in leave_dates:
+		return True
+
+	return get_day_type(policy.holiday_list, attendance_date) != DAY_TYPE_WORKING
+
+
+def on_leave_change(doc, method=None):
+	"""Leave Application on_submit / on_cancel: recompute what its dates affect"""
+	# Imported here to avoid a circular import with the handler
+	from fours_customizations.attendance_sync import mark_dirty
+	from fours_customizations.rolling_counters import invalidate_employee_counters
+	from fours_customizations.self_service import invalidate_employee_accumulators
+
+	mark_dirty([
+		(doc.employee, add_days(doc.from_date, offset))
+		for offset in range(date_diff(doc.to_date, doc.from_date) + 1)
+	])
+
+	employee = frappe._dict(name=doc.employee)
+	invalidate_employee_accumulators(employee)
+	invalidate_employee_counters(employee)
@@ -0,0 +1,260 @@
+"""
+High-volume synthetic data for load testing payroll
+Builds designations with policies, employees and a year of attendance through bulk inserts
+
+Usage:
+	bench --site YOUR_SITE execute fours_customizations.load_test_data.generate_load_test_data --kwargs "{'employees': 3000, 'seed': 7}"
+	bench --site YOUR_SITE execute fours_customizations.load_test_data.delete_load_test_data
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+
+import frappe
+from frappe.utils import getdate, now_datetime
+
+PREFIX = 'LT'
+DESIGNATION_PREFIX = 'Load Test Designation'
+
+# Share of working days per scenario; the rest are plain on-time days
+SCENARIO_WEIGHTS = {
+	'absent': 0.03,
+	'late': 0.08,
+	'early_exit': 0.05,
+	'no_checkout': 0.03,
+	'overtime': 0.20
+}
+
+
+def generate_load_test_data(designations=5, employees=1000, year=None, seed=42, company=None, chunk_size=10000):
+	"""
+	Populate the site with reproducible synthetic payroll data.
+
+	Args:
+		designations (int): Number of designations to create with deduction and overtime policies
+		employees (int): Number of employees to spread across the designations
+		year (int): Calendar year of attendance to generate (defaults to the current year)
+		seed (int): Random seed; the same seed always produces the same data
+		company (str): Company for employees and attendance (defaults to the site default)
+		chunk_size (int): Rows per bulk insert
+
+	Returns:
+		dict: Counts of created records
+	"""
+	frappe.set_user("Administrator")
+
+	rng = random.Random(seed)
+	year = int(year or getdate().year)
+	company = company or frappe.defaults.get_global_default('company')
+
+	if not company:
+		frappe.throw("No company found. Pass company=... or set a default company.")
+
+	print("\n" + "="*60)
+	print(f"GENERATING LOAD TEST DATA (seed={seed}, year={year})")
+	print("="*60)
+
+	designation_names = _create_designations(rng, int(designations))
+	print(f"✓ {len(designation_names)} designation(s) with policies")
+
+	employee_rows = _insert_employees(rng, int(employees), designation_names, company, year, int(chunk_size))
+	print(f"✓ {len(employee_rows)} employee(s)")
+
+	attendance_count = _insert_attendance(seed, employee_rows, company, year, int(chunk_size))
+	print(f"✓ {attendance_count} attendance record(s)")
+
+	print("="*60 + "\n")
+
+	return {
+		'designations': len(designation_names),
+		'employees': len(employee_rows),
+		'attendance': attendance_count
+	}
+
+
+def _create_designations(rng, count):
+	"""Create (or update) the load test designations with randomized policies"""
+	names = []
+
+	for i in range(1, count + 1):
+		name = f"{DESIGNATION_PREFIX} {i}"
+
+		if frappe.db.exists('Designation', name):
+			designation = frappe.get_doc('Designation', name)
+		else:
+			designation = frappe.get_doc({
+				'doctype': 'Designation',
+				'designation_name': name,
+				'description': 'Synthetic designation for payroll load testing'
+			})
+
+		base = rng.choice([1000, 2000, 5000])
+		designation.absent_deduction = base * 2
+		designation.late_deduction = base
+		designation.early_exit_deduction = base
+		designation.no_checkout_deduction = base
+		designation.overtime_start_time = '17:00:00'
+		designation.overtime_end_time = rng.choice(['22:00:00', '23:00:00', '01:00:00'])
+		designation.overtime_hourly_rate = base * rng.choice([2, 3, 4])
+		designation.holiday_overtime_multiplier = 2
+		designation.weekly_off_overtime_multiplier = 1.5
+
+		designation.set('overtime_tiers', [])
+		if rng.random() < 0.5:
+			designation.append('overtime_tiers', {'from_time': '20:00:00', 'rate_multiplier': 1.5})
+
+		designation.save(ignore_permissions=True)
+		names.append(name)
+
+	frappe.db.commit()
+	return names
+
+
+def _insert_employees(rng, count, designation_names, company, year, chunk_size):
+	"""Bulk insert employees, skipping ones left over from a previous run"""
+	now = now_datetime()
+	existing = set(frappe.get_all('Employee', filters={'name': ['like', f'{PREFIX}-EMP-%']}, pluck='name'))
+
+	fields = [
+		'name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus',
+		'first_name', 'employee_name', 'gender', 'date_of_birth', 'date_of_joining',
+		'status', 'company', 'designation'
+	]
+
+	employee_rows = []
+	values = []
+
+	for i in range(1, count + 1):
+		name = f"{PREFIX}-EMP-{i:06d}"
+		first_name = f"Load Test {i}"
+		employee_rows.append((name, first_name))
+
+		# Drawn for skipped employees too, so a resumed run gives the rest the same values
+		row = (
+			name, now, now, 'Administrator', 'Administrator', 0,
+			first_name, first_name, rng.choice(['Male', 'Female']),
+			date(rng.randint(1960, 2000), rng.randint(1, 12), rng.randint(1, 28)),
+			date(year - rng.randint(1, 10), 1, 1),
+			'Active', company, rng.choice(designation_names)
+		)
+
+		if name not in existing:
+			values.append(row)
+
+	frappe.db.bulk_insert('Employee', fields, values, chunk_size=chunk_size)
+	frappe.db.commit()
+
+	return employee_rows
+
+
+def _insert_attendance(seed, employee_rows, company, year, chunk_size):
+	"""
+	Bulk insert a year of submitted attendance per employee.
+
+	Rows are flushed once at least chunk_size have built up, and only between employees,
+	so every commit holds whole years and a resumed run can skip employees that have any
+	rows. Each employee's days come from their own generator seeded with the run's seed,
+	so employees skipped by a resumed run don't shift the values of the others.
+	"""
+	now = now_datetime()
+	start = date(year, 1, 1)
+	days = (date(year, 12, 31) - start).days + 1
+
+	fields = [
+		'name', 'creation', 'modified', 'owner', 'modified_by', 'docstatus',
+		'employee', 'employee_name', 'attendance_date', 'status', 'company',
+		'in_time', 'out_time', 'late_entry', 'early_exit'
+	]
+
+	existing_employees = set(frappe.get_all(
+		'Attendance',
+		filters={'name': ['like', f'{PREFIX}-ATT-%'], 'attendance_date': ['between', [start, date(year, 12, 31)]]},
+		pluck='employee',
+		distinct=True
+	))
+
+	total = 0
+	values = []
+
+	for employee, employee_name in employee_rows:
+		if employee in existing_employees:
+			continue
+
+		rng = random.Random(f"{seed}-{employee}")
+
+		for offset in range(days):
+			attendance_date = start + timedelta(days=offset)
+
+			# Sundays off
+			if attendance_date.weekday() == 6:
+				continue
+
+			status, in_time, out_time, late_entry, early_exit = _random_day(rng, attendance_date)
+
+			values.append((
+				f"{PREFIX}-ATT-{employee}-{attendance_date:%Y%m%d}", now, now, 'Administrator', 'Administrator', 1,
+				employee, employee_name, attendance_date, status, company,
+				in_time, out_time, late_entry, early_exit
+			))
+
+		if len(values) >= chunk_size:
+			frappe.db.bulk_insert('Attendance', fields, values, chunk_size=chunk_size)
+			frappe.db.commit()
+			total += len(values)
+			values = []
+
+	if values:
+		frappe.db.bulk_insert('Attendance', fields, values, chunk_size=chunk_size)
+		frappe.db.commit()
+		total += len(values)
+
+	return total
+
+
+def _random_day(rng, attendance_date):
+	"""Pick a realistic scenario for one working day"""
+	roll = rng.random()
+	scenario = 'normal'
+	for name, weight in SCENARIO_WEIGHTS.items():
+		if roll < weight:
+			scenario = name
+			break
+		roll -= weight
+
+	if scenario == 'absent':
+		return 'Absent', None, None, 0, 0
+
+	in_minutes = rng.randint(7 * 60 + 30, 8 * 60)
+	out_minutes = rng.randint(16 * 60 + 45, 17 * 60)
+	late_entry = early_exit = 0
+
+	if scenario == 'late':
+		in_minutes = rng.randint(8 * 60 + 16, 10 * 60)
+		late_entry = 1
+	elif scenario == 'early_exit':
+		out_minutes = rng.randint(13 * 60, 16 * 60 + 44)
+		early_exit = 1
+	elif scenario == 'overtime':
+		out_minutes = rng.randint(17 * 60 + 15, 24 * 60 + 60)
+
+	in_time = datetime.combine(attendance_date, time()) + timedelta(minutes=in_minutes)
+	out_time = None
+	if scenario != 'no_checkout':
+		out_time = datetime.combine(attendance_date, time()) + timedelta(minutes=out_minutes)
+
+	return 'Present', in_time, out_time, late_entry, early_exit
+
+
+def delete_load_test_data():
+	"""Remove everything created by generate_load_test_data"""
+	frappe.set_user("Administrator")
+
+	frappe.db.delete('Attendance', {'name': ['like', f'{PREFIX}-ATT-%']})
+	frappe.db.delete('Employee', {'name': ['like', f'{PREFIX}-EMP-%']})
+	frappe.db.commit()
+
+	for name in frappe.get_all('Designation', filters={'name': ['like', f'{DESIGNATION_PREFIX} %']}, pluck='name'):
+		frappe.delete_doc('Designation', name, ignore_permissions=True, force=True)
+
+	frappe.db.commit()
+	print("✓ Load test data deleted")
@@ -0,0 +1,69 @@
+"""
+Money arithmetic for Fours Customizations
+Amounts are handled as integer minor units (cents, or shillings for zero-decimal currencies)
+and rounded at one explicit point instead of after every float operation
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import frappe
+
+DEFAULT_PRECISION = 2
+
+# Rate multipliers are held as integer thousandths (1.5 -> 1500)
+MULTIPLIER_SCALE = 1000
+
+# Where overtime is rounded to minor units: each day, or once on the period total
+ROUNDING_DAY = 'day'
+ROUNDING_PERIOD = 'period'
+
+
+def get_money_precision():
+	"""
+	Decimal places of a minor unit.
+
+	`fours_money_precision` in site_config.json wins, then the system currency precision, then 2.
+	"""
+	precision = frappe.conf.get('fours_money_precision')
+	if precision is None or precision == '':
+		precision = frappe.db.get_default('currency_precision')
+
+	if precision is None or precision == '':
+		return DEFAULT_PRECISION
+
+	return int(precision)
+
+
+def get_overtime_rounding():
+	"""Overtime rounding point from `fours_overtime_rounding` in site_config.json ('day' or 'period')"""
+	return ROUNDING_PERIOD if frappe.conf.get('fours_overtime_rounding') == ROUNDING_PERIOD else ROUNDING_DAY
+
+
+def _quantize(value):
+	"""Round a Decimal to an integer, half up"""
+	return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_minor(amount, precision=None):
+	"""Convert a currency amount to integer minor units"""
+	precision = get_money_precision() if precision is None else precision
+	return _quantize(Decimal(str(amount or 0)).scaleb(precision))
+
+
+def from_minor(minor, precision=None):
+	"""Convert integer minor units back to a currency amount"""
+	precision = get_money_precision() if precision is None else precision
+	return float(Decimal(minor).scaleb(-precision))
+
+
+def to_scaled_multiplier(multiplier):
+	"""Convert a rate multiplier to integer thousandths"""
+	return _quantize(Decimal(str(multiplier if multiplier is not None else 1)) * MULTIPLIER_SCALE)
+
+
+def div_round(numerator, denominator):
+	"""Integer division rounded half up (away from zero), without going through floats"""
+	quotient, remainder = divmod(abs(numerator), denominator)
+	if 2 * remainder >= denominator:
+		quotient += 1
+	return quotient if numerator >= 0 else -quotient
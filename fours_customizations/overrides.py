@@ -0,0 +1,60 @@
+"""
+Doctype controller overrides for Fours Customizations
+"""
+
+from hrms.payroll.doctype.salary_slip.salary_slip import SalarySlip
+
+from fours_customizations.salary_slip_handler import apply_slip_adjustments, get_slip_adjustments
+from fours_customizations.slip_snapshot import set_slip_snapshot
+
+
+class FoursSalarySlip(SalarySlip):
+	"""
+	Salary Slip that adds the attendance deductions and designation overtime while HRMS
+	calculates the slip, so gross pay, deductions, net pay, rounding and the base currency
+	fields are all worked out once by HRMS itself.
+	"""
+
+	def calculate_net_pay(self, *args, **kwargs):
+		computation = self._get_attendance_adjustments()
+
+		if computation and not self.salary_structure:
+			# Without a structure HRMS doesn't calculate component amounts, so add ours up front
+			apply_slip_adjustments(self, computation, 'earnings')
+			apply_slip_adjustments(self, computation, 'deductions')
+
+		super().calculate_net_pay(*args, **kwargs)
+
+		if computation:
+			set_slip_snapshot(self, computation)
+
+	def calculate_component_amounts(self, component_type):
+		super().calculate_component_amounts(component_type)
+
+		# After the structure rows, which may reset ours to the structure amount
+		computation = self._get_attendance_adjustments()
+		if computation:
+			apply_slip_adjustments(self, computation, component_type)
+
+	def on_update(self):
+		parent = getattr(super(), 'on_update', None)
+		if parent:
+			parent()
+
+		# Saved: the next save reads attendance again
+		self.flags.fours_adjustments = None
+
+	def _get_attendance_adjustments(self):
+		"""
+		The period's adjustments, computed once per save however often HRMS recalculates.
+
+		Slips built by Payroll Entry are calculated before insert and again while
+		validating; both use the same computation unless the employee or period changed.
+		"""
+		key = (self.employee, str(self.start_date), str(self.end_date))
+		cached = self.flags.fours_adjustments
+
+		if not cached or cached[0] != key:
+			cached = self.flags.fours_adjustments = (key, get_slip_adjustments(self))
+
+		return cached[1]
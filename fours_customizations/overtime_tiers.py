@@ -0,0 +1,84 @@
+"""
+Tiered overtime rate tables for Fours Customizations
+A designation's overtime window and tiers are compiled into a cumulative pay-by-time-of-day table
+"""
+
+from bisect import bisect_right
+
+from frappe.utils import get_time
+
+from fours_customizations.money import MULTIPLIER_SCALE, to_scaled_multiplier
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _seconds_after(start_time, time_value):
+	"""Seconds from start_time forward to time_value, wrapping past midnight"""
+	start = get_time(start_time)
+	value = get_time(time_value)
+	start_seconds = start.hour * 3600 + start.minute * 60 + start.second
+	value_seconds = value.hour * 3600 + value.minute * 60 + value.second
+	return (value_seconds - start_seconds) % SECONDS_PER_DAY
+
+
+def compile_rate_table(overtime_start_time, overtime_end_time, tiers=None):
+	"""
+	Compile an overtime window and its tiers into a cumulative rate table.
+
+	Offsets are whole seconds after overtime_start_time. Each breakpoint carries the
+	multiplier paid from that offset onwards (in MULTIPLIER_SCALE units) and the
+	multiplier-weighted seconds accrued before it, so the pay for any checkout is one
+	bisect plus an integer multiplication.
+
+	Args:
+		overtime_start_time (time): Overtime window start time
+		overtime_end_time (time): Overtime window end time (cap)
+		tiers (list): Rows with 'from_time' and 'rate_multiplier'
+
+	Returns:
+		dict: {'window_seconds', 'breakpoints', 'multipliers', 'cumulative'}
+	"""
+	window_seconds = _seconds_after(overtime_start_time, overtime_end_time)
+
+	# The window opens at the base rate unless a tier starts exactly at the start time
+	steps = {0: MULTIPLIER_SCALE}
+	for tier in tiers or []:
+		# Time values load as timedelta, and 00:00 (timedelta(0)) is a valid tier start
+		if tier.get('from_time') is None:
+			continue
+
+		offset = _seconds_after(overtime_start_time, tier.get('from_time'))
+		if offset < window_seconds or offset == 0:
+			steps[offset] = to_scaled_multiplier(tier.get('rate_multiplier') or 1)
+
+	breakpoints = sorted(steps)
+	multipliers = [steps[offset] for offset in breakpoints]
+
+	cumulative = [0]
+	for i in range(1, len(breakpoints)):
+		cumulative.append(cumulative[-1] + (breakpoints[i] - breakpoints[i - 1]) * multipliers[i - 1])
+
+	return {
+		'window_seconds': window_seconds,
+		'breakpoints': breakpoints,
+		'multipliers': multipliers,
+		'cumulative': cumulative
+	}
+
+
+def get_weighted_seconds(rate_table, seconds_after_start):
+	"""
+	Get the multiplier-weighted overtime for a checkout offset.
+
+	Args:
+		rate_table (dict): Table from compile_rate_table
+		seconds_after_start (int): Seconds worked after the window start, already capped
+
+	Returns:
+		int: Seconds weighted by tier multipliers, in MULTIPLIER_SCALE units
+	"""
+	if seconds_after_start <= 0:
+		return 0
+
+	i = bisect_right(rate_table['breakpoints'], seconds_after_start) - 1
+	return rate_table['cumulative'][i] + (seconds_after_start - rate_table['breakpoints'][i]) * rate_table['multipliers'][i]
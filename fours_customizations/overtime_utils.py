@@ -1,20 +1,48 @@
 """Utility functions for calculating designation-based overtime"""
 
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+
 import frappe
 from frappe import _
 from frappe.utils import (
-	getdate,
+	add_days,
+	flt,
 	get_datetime,
-	time_diff_in_hours,
+	get_first_day,
 	get_time,
-	now_datetime
+	getdate,
+	now_datetime,
+	time_diff_in_hours,
+)
+
+from fours_customizations.attendance_query import iter_attendance
+from fours_customizations.holiday_calendar import get_day_type, get_overtime_multiplier
+from fours_customizations.money import (
+	MULTIPLIER_SCALE,
+	ROUNDING_PERIOD,
+	div_round,
+	from_minor,
+	get_overtime_rounding,
+	to_minor,
+	to_scaled_multiplier,
 )
-from datetime import datetime, time as dt_time, timedelta
+from fours_customizations.overtime_tiers import compile_rate_table, get_weighted_seconds
+from fours_customizations.policy import has_overtime_policy, resolve_policy
+from fours_customizations.rate_versions import get_rates_on
+from fours_customizations.replica import use_read_replica
+from fours_customizations.shift_schedule import get_shift_end, load_shift_schedule
+from fours_customizations.slip_components import acquire_slip_lock, upsert_component
 
+# Per-day exact amounts are in minor units x seconds/hour x two multiplier scales
+# (tier multiplier and day multiplier)
+OVERTIME_DENOMINATOR = 3600 * MULTIPLIER_SCALE * MULTIPLIER_SCALE
 
+
+@use_read_replica
 def calculate_designation_overtime(employee, start_date, end_date):
 	"""
-	Calculate overtime hours and payment for an employee based on their designation's overtime configuration.
+	Calculate overtime hours and payment for an employee based on their resolved overtime policy.
 
 	Args:
 		employee (str): Employee ID
@@ -23,89 +51,341 @@ def calculate_designation_overtime(employee, start_date, end_date):
 
 	Returns:
 		dict: {
-			'total_hours': float,
+			'total_hours': float (paid hours),
+			'unpaid_hours': float (hours past the monthly cap),
+			'capped_days': list of dates cut by the monthly cap,
 			'total_amount': float,
 			'daily_breakdown': list of dicts with daily overtime details
 		}
 	"""
 
-	# Get employee and designation
-	emp_doc = frappe.get_doc('Employee', employee)
+	# Employee -> Designation -> Department -> Company
+	policy = resolve_policy(employee)
 
-	if not emp_doc.designation:
-		return {
-			'total_hours': 0,
-			'total_amount': 0,
-			'daily_breakdown': [],
-			'error': 'Employee has no designation assigned'
-		}
+	# Check if the employee has an overtime configuration at any level
+	if not has_overtime_policy(policy):
+		return _empty_overtime_result(policy)
+
+	# Get all attendance records for the period with checkout times
+	attendance_records = _get_overtime_attendance([employee], start_date, end_date)
+	shift_schedule = load_shift_schedule([employee], start_date, end_date) if policy.overtime_from_shift_end else None
 
-	designation = frappe.get_doc('Designation', emp_doc.designation)
+	return _calculate_overtime_for_records(policy, attendance_records, shift_schedule, get_cap_carry_in(policy, start_date))
 
-	# Check if designation has overtime configuration
-	if not designation.overtime_start_time or not designation.overtime_end_time or not designation.overtime_hourly_rate:
-		return {
-			'total_hours': 0,
-			'total_amount': 0,
-			'daily_breakdown': [],
-			'note': f'Designation {designation.name} has no overtime configuration'
-		}
 
-	# Get all attendance records for the period with checkout times
-	attendance_records = frappe.get_all(
-		'Attendance',
-		filters={
-			'employee': employee,
-			'attendance_date': ['between', [start_date, end_date]],
-			'status': ['in', ['Present', 'Half Day']],
-			'docstatus': 1  # Only submitted attendance
-		},
-		fields=['name', 'attendance_date', 'in_time', 'out_time', 'status'],
-		order_by='attendance_date'
+@use_read_replica
+def calculate_bulk_designation_overtime(employees, start_date, end_date):
+	"""
+	Calculate designation overtime for many employees with one attendance query.
+
+	Args:
+		employees (list): Employee IDs
+		start_date (str/date): Start date of the period
+		end_date (str/date): End date of the period
+
+	Returns:
+		dict: Employee ID -> result in the same shape as calculate_designation_overtime
+	"""
+	if not employees:
+		return {}
+
+	policies = {employee: resolve_policy(employee) for employee in employees}
+	breakdowns = {employee: [] for employee in employees}
+
+	# Everyone's shift assignments in one query, when any policy measures from the shift end
+	shift_employees = [employee for employee, policy in policies.items() if policy.overtime_from_shift_end]
+	shift_schedule = load_shift_schedule(shift_employees, start_date, end_date) if shift_employees else None
+
+	# One streamed pass over everyone's attendance; only overtime days are kept
+	for attendance in _get_overtime_attendance(employees, start_date, end_date):
+		policy = policies[attendance.employee]
+		if not has_overtime_policy(policy):
+			continue
+
+		entry = price_overtime_day(policy, attendance, shift_schedule)
+		if entry:
+			breakdowns[attendance.employee].append(entry)
+
+	results = {}
+
+	for employee, policy in policies.items():
+		if not has_overtime_policy(policy):
+			results[employee] = _empty_overtime_result(policy)
+			continue
+
+		results[employee] = summarize_overtime(policy, breakdowns[employee], get_cap_carry_in(policy, start_date))
+
+	return results
+
+
+def _empty_overtime_result(policy):
+	"""Result for an employee whose policy has no overtime configuration"""
+	return {
+		'total_hours': 0,
+		'total_amount': 0,
+		'daily_breakdown': [],
+		'designation': policy.designation,
+		'note': f'No overtime configuration for employee {policy.employee}'
+	}
+
+
+def _get_overtime_attendance(employees, start_date, end_date):
+	"""Stream submitted Present/Half Day attendance for the employees, ordered by date"""
+	return iter_attendance(
+		employees,
+		start_date,
+		end_date,
+		fields=['employee', 'in_time', 'out_time', 'status'],
+		statuses=['Present', 'Half Day']
 	)
 
-	total_hours = 0.0
-	total_amount = 0.0
+
+def _calculate_overtime_for_records(policy, attendance_records, shift_schedule=None, running_total=None):
+	"""
+	Price one employee's attendance records against their resolved overtime policy.
+
+	Shared by the scalar and batch paths so both use the same compiled rate table.
+	"""
 	daily_breakdown = []
 
 	for attendance in attendance_records:
-		if not attendance.out_time:
-			# No checkout time, skip this record
-			continue
+		entry = price_overtime_day(policy, attendance, shift_schedule)
+		if entry:
+			daily_breakdown.append(entry)
+
+	return summarize_overtime(policy, daily_breakdown, running_total)
+
+
+def price_overtime_day(policy, attendance, shift_schedule=None):
+	"""
+	Get the daily breakdown entry for one attendance row, or None when it earns no overtime.
+
+	With `overtime_from_shift_end` set on the policy and a `shift_schedule` from
+	load_shift_schedule, the window opens when the day's shift ends and keeps the policy's
+	window length and tiers. Days without a known shift use the fixed window.
+	"""
+	if not attendance.out_time:
+		# No checkout time, skip this record
+		return None
+
+	overtime_start_time = policy.overtime_start_time
+	overtime_end_time = policy.overtime_end_time
+	window_date = attendance.attendance_date
+	shift = None
+
+	if policy.overtime_from_shift_end and shift_schedule:
+		shift, shift_end = get_shift_end(shift_schedule, policy.employee, attendance, policy.default_shift)
+		if shift_end:
+			overtime_start_time = shift_end.time()
+			overtime_end_time = (shift_end + timedelta(seconds=policy.rate_table['window_seconds'])).time()
+			# Night shifts end, and their overtime starts, on the next day
+			window_date = shift_end.date()
+
+	# Holidays and weekly offs are paid at the policy's multiplier
+	day_type = get_day_type(policy.holiday_list, attendance.attendance_date)
+	rate_multiplier = get_overtime_multiplier(day_type, policy)
+
+	# The rate in effect on the day, when the Designation's rate changed within the period
+	hourly_rate = get_rates_on(policy, attendance.attendance_date)['overtime_hourly_rate']
+
+	overtime_info = calculate_daily_overtime(
+		attendance.out_time,
+		overtime_start_time,
+		overtime_end_time,
+		hourly_rate,
+		window_date,
+		rate_table=policy.rate_table,
+		rate_multiplier=rate_multiplier
+	)
+
+	if overtime_info['seconds'] <= 0:
+		return None
+
+	return _overtime_entry(
+		attendance.attendance_date,
+		attendance.name,
+		attendance.out_time,
+		overtime_info['seconds'],
+		overtime_info['amount_exact'],
+		overtime_info['capped'],
+		day_type,
+		shift,
+		hourly_rate,
+		rate_multiplier
+	)
+
+
+def pack_overtime_day(entry):
+	"""Compact list form of an entry from price_overtime_day, for stored per-row state"""
+	return [
+		str(entry['checkout_time']),
+		entry['overtime_seconds'],
+		entry['overtime_amount_exact'],
+		int(entry['capped']),
+		entry['day_type'],
+		entry['shift'],
+		entry['hourly_rate'],
+		entry['rate_multiplier']
+	]
+
+
+def unpack_overtime_day(packed, attendance_date, attendance):
+	"""Rebuild the entry of price_overtime_day from pack_overtime_day's list"""
+	checkout_time, seconds, amount_exact, capped, day_type, shift, hourly_rate, rate_multiplier = packed
+	return _overtime_entry(
+		getdate(attendance_date),
+		attendance,
+		get_datetime(checkout_time),
+		seconds,
+		amount_exact,
+		bool(capped),
+		day_type,
+		shift,
+		hourly_rate,
+		rate_multiplier
+	)
+
+
+def _overtime_entry(attendance_date, attendance, checkout_time, seconds, amount_exact, capped, day_type, shift, hourly_rate, rate_multiplier):
+	amount_minor = div_round(amount_exact, OVERTIME_DENOMINATOR)
+
+	return {
+		'date': attendance_date,
+		'attendance': attendance,
+		'checkout_time': checkout_time,
+		'overtime_hours': round(seconds / 3600, 2),
+		'overtime_seconds': seconds,
+		'overtime_amount': from_minor(amount_minor),
+		'overtime_amount_minor': amount_minor,
+		'overtime_amount_exact': amount_exact,
+		'capped': capped,
+		'monthly_capped': False,
+		'unpaid_hours': 0,
+		'unpaid_seconds': 0,
+		'day_type': day_type,
+		'shift': shift,
+		'hourly_rate': hourly_rate,
+		'rate_multiplier': rate_multiplier
+	}
+
+
+def apply_monthly_cap(policy, entry, running_total):
+	"""
+	Cut one day's overtime at the policy's monthly hour cap.
+
+	Days must be passed in date order with the same `running_total` dict for one
+	employee; the total restarts at each calendar month. A day that crosses the cap is
+	paid up to it and later days in the month are not paid. Cut days come back as a copy
+	with `monthly_capped` set and the unpaid time, other days are returned unchanged.
+
+	Args:
+		policy (frappe._dict): Resolved policy
+		entry (dict): Daily breakdown entry from price_overtime_day
+		running_total (dict): Carried between calls, {'month': (year, month), 'seconds': paid so far}
+
+	Returns:
+		dict: The entry as paid
+	"""
+	cap_seconds = int(flt(policy.monthly_overtime_hour_cap) * 3600)
+	if cap_seconds <= 0:
+		return entry
+
+	attendance_date = getdate(entry['date'])
+	month = (attendance_date.year, attendance_date.month)
+	if running_total.get('month') != month:
+		running_total['month'] = month
+		running_total['seconds'] = 0
+
+	paid_seconds = min(entry['overtime_seconds'], max(cap_seconds - running_total['seconds'], 0))
+	running_total['seconds'] += paid_seconds
+
+	if paid_seconds == entry['overtime_seconds']:
+		return entry
+
+	# The unpaid part is the end of the day, i.e. the latest (highest) tiers
+	amount_exact = get_overtime_amount_exact(
+		entry.get('hourly_rate', policy.overtime_hourly_rate),
+		entry['rate_multiplier'],
+		policy.rate_table or compile_rate_table(policy.overtime_start_time, policy.overtime_end_time),
+		paid_seconds
+	)
+	amount_minor = div_round(amount_exact, OVERTIME_DENOMINATOR)
+	unpaid_seconds = entry['overtime_seconds'] - paid_seconds
+
+	return {
+		**entry,
+		'overtime_hours': round(paid_seconds / 3600, 2),
+		'overtime_seconds': paid_seconds,
+		'overtime_amount': from_minor(amount_minor),
+		'overtime_amount_minor': amount_minor,
+		'overtime_amount_exact': amount_exact,
+		'monthly_capped': True,
+		'unpaid_hours': round(unpaid_seconds / 3600, 2),
+		'unpaid_seconds': unpaid_seconds
+	}
+
+
+def get_cap_carry_in(policy, start_date):
+	"""
+	Get the monthly cap's running total at the start of a period that begins mid-month.
 
-		overtime_info = calculate_daily_overtime(
-			attendance.out_time,
-			designation.overtime_start_time,
-			designation.overtime_end_time,
-			designation.overtime_hourly_rate,
-			attendance.attendance_date
-		)
-
-		if overtime_info['hours'] > 0:
-			total_hours += overtime_info['hours']
-			total_amount += overtime_info['amount']
-
-			daily_breakdown.append({
-				'date': attendance.attendance_date,
-				'attendance': attendance.name,
-				'checkout_time': attendance.out_time,
-				'overtime_hours': overtime_info['hours'],
-				'overtime_amount': overtime_info['amount'],
-				'capped': overtime_info['capped']
-			})
+	A payroll period such as 26 Jan - 25 Feb only sees part of January, so the overtime
+	paid for that month's days before the period counts towards January's cap. Those days
+	are priced again with the same streamed read, capped as they were paid.
+
+	Returns:
+		dict: Running total for apply_monthly_cap; empty without a cap or from the 1st
+	"""
+	start_date = getdate(start_date)
+	if flt(policy.monthly_overtime_hour_cap) <= 0 or start_date.day == 1 or not has_overtime_policy(policy):
+		return {}
+
+	month_start = get_first_day(start_date)
+	day_before = add_days(start_date, -1)
+	shift_schedule = load_shift_schedule([policy.employee], month_start, day_before) if policy.overtime_from_shift_end else None
+	running_total = {}
+
+	for attendance in _get_overtime_attendance([policy.employee], month_start, day_before):
+		entry = price_overtime_day(policy, attendance, shift_schedule)
+		if entry:
+			apply_monthly_cap(policy, entry, running_total)
+
+	return running_total
+
+
+def summarize_overtime(policy, daily_breakdown, running_total=None):
+	"""
+	Total a daily breakdown into the overtime result.
+
+	The monthly hour cap is applied on the way, as a running total over the days in
+	date order, starting from `running_total` (see get_cap_carry_in) when given. Totals
+	are summed in integer minor units. With `fours_overtime_rounding` set to 'period' the
+	exact per-day amounts are summed and rounded once instead.
+	"""
+	running_total = dict(running_total or {})
+	daily_breakdown = [apply_monthly_cap(policy, day, running_total) for day in daily_breakdown]
+
+	if get_overtime_rounding() == ROUNDING_PERIOD:
+		total_minor = div_round(sum(day['overtime_amount_exact'] for day in daily_breakdown), OVERTIME_DENOMINATOR)
+	else:
+		total_minor = sum(day['overtime_amount_minor'] for day in daily_breakdown)
 
 	return {
-		'total_hours': round(total_hours, 2),
-		'total_amount': round(total_amount, 2),
+		'total_hours': round(sum(day['overtime_seconds'] for day in daily_breakdown) / 3600, 2),
+		'unpaid_hours': round(sum(day.get('unpaid_seconds', 0) for day in daily_breakdown) / 3600, 2),
+		'capped_days': [day['date'] for day in daily_breakdown if day.get('monthly_capped')],
+		'total_amount': from_minor(total_minor),
+		'total_amount_minor': total_minor,
 		'daily_breakdown': daily_breakdown,
-		'designation': designation.name,
-		'overtime_start_time': designation.overtime_start_time,
-		'overtime_end_time': designation.overtime_end_time,
-		'hourly_rate': designation.overtime_hourly_rate
+		'designation': policy.designation,
+		'overtime_start_time': policy.overtime_start_time,
+		'overtime_end_time': policy.overtime_end_time,
+		'hourly_rate': policy.overtime_hourly_rate,
+		'monthly_overtime_hour_cap': policy.monthly_overtime_hour_cap
 	}
 
 
-def calculate_daily_overtime(checkout_datetime, overtime_start_time, overtime_end_time, hourly_rate, attendance_date):
+def calculate_daily_overtime(checkout_datetime, overtime_start_time, overtime_end_time, hourly_rate, attendance_date, rate_table=None, rate_multiplier=1):
 	"""
 	Calculate overtime for a single day.
 
@@ -115,13 +395,24 @@ def calculate_daily_overtime(checkout_datetime, overtime_start_time, overtime_en
 		overtime_end_time (time): Overtime window end time (cap)
 		hourly_rate (float): Hourly overtime rate
 		attendance_date (date): Date of attendance
+		rate_table (dict): Compiled tier table; a flat single-rate table is used when omitted
+		rate_multiplier (float): Day multiplier (holiday / weekly off) applied on top of the tiers
 
 	Returns:
-		dict: {'hours': float, 'amount': float, 'capped': bool}
+		dict: {
+			'hours': float, 'seconds': int, 'capped': bool,
+			'amount': float, 'amount_minor': int (rounded to minor units),
+			'amount_exact': int (unrounded, in minor units x OVERTIME_DENOMINATOR)
+		}
 	"""
 
+	no_overtime = {'hours': 0, 'seconds': 0, 'amount': 0, 'amount_minor': 0, 'amount_exact': 0, 'capped': False}
+
 	if not checkout_datetime:
-		return {'hours': 0, 'amount': 0, 'capped': False}
+		return no_overtime
+
+	if rate_table is None:
+		rate_table = compile_rate_table(overtime_start_time, overtime_end_time)
 
 	# Convert to datetime objects
 	checkout_dt = get_datetime(checkout_datetime)
@@ -139,7 +430,7 @@ def calculate_daily_overtime(checkout_datetime, overtime_start_time, overtime_en
 
 	# If checkout is before overtime start, no overtime
 	if checkout_dt <= overtime_start_dt:
-		return {'hours': 0, 'amount': 0, 'capped': False}
+		return no_overtime
 
 	# Determine the effective end time (checkout or overtime cap, whichever is earlier)
 	capped = False
@@ -149,23 +440,33 @@ def calculate_daily_overtime(checkout_datetime, overtime_start_time, overtime_en
 	else:
 		effective_end_dt = checkout_dt
 
-	# Calculate hours between overtime start and effective end
-	hours = time_diff_in_hours(effective_end_dt, overtime_start_dt)
-
-	# Ensure non-negative hours
-	if hours < 0:
-		hours = 0
+	# Whole seconds between overtime start and effective end
+	seconds = max(int((effective_end_dt - overtime_start_dt).total_seconds()), 0)
 
-	# Calculate amount
-	amount = hours * hourly_rate
+	# Exact amount in integer arithmetic: one bisect into the tier table, whatever the
+	# number of tiers, then a single rounding to minor units
+	amount_exact = get_overtime_amount_exact(hourly_rate, rate_multiplier, rate_table, seconds)
+	amount_minor = div_round(amount_exact, OVERTIME_DENOMINATOR)
 
 	return {
-		'hours': round(hours, 2),
-		'amount': round(amount, 2),
+		'hours': round(seconds / 3600, 2),
+		'seconds': seconds,
+		'amount': from_minor(amount_minor),
+		'amount_minor': amount_minor,
+		'amount_exact': amount_exact,
 		'capped': capped
 	}
 
 
+def get_overtime_amount_exact(hourly_rate, rate_multiplier, rate_table, seconds):
+	"""Unrounded amount of the first `seconds` of the overtime window, in minor units x OVERTIME_DENOMINATOR"""
+	return (
+		to_minor(hourly_rate)
+		* to_scaled_multiplier(rate_multiplier)
+		* get_weighted_seconds(rate_table, seconds)
+	)
+
+
 def add_designation_overtime_to_salary_slip(salary_slip):
 	"""
 	Calculate and add designation-based overtime to a salary slip.
@@ -180,6 +481,8 @@ def add_designation_overtime_to_salary_slip(salary_slip):
 	if not salary_slip.employee:
 		return 0
 
+	acquire_slip_lock(salary_slip.employee, salary_slip.start_date)
+
 	# Calculate overtime for the salary period
 	overtime_data = calculate_designation_overtime(
 		salary_slip.employee,
@@ -190,23 +493,6 @@ def add_designation_overtime_to_salary_slip(salary_slip):
 	if overtime_data['total_amount'] <= 0:
 		return 0
 
-	# Check if overtime component already exists in earnings
-	component_name = 'Designation Overtime Pay'
-	existing_component = None
-
-	for earning in salary_slip.earnings:
-		if earning.salary_component == component_name:
-			existing_component = earning
-			break
-
-	if existing_component:
-		# Update existing component
-		existing_component.amount = overtime_data['total_amount']
-	else:
-		# Add new component
-		salary_slip.append('earnings', {
-			'salary_component': component_name,
-			'amount': overtime_data['total_amount']
-		})
+	upsert_component(salary_slip, 'earnings', 'Designation Overtime Pay', overtime_data['total_amount'])
 
 	return overtime_data['total_amount']
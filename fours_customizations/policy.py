@@ -0,0 +1,151 @@
+"""
+Attendance policy resolution for Fours Customizations
+Rates are resolved Employee -> Designation -> Department -> Company and memoized per employee
+"""
+
+import frappe
+
+from fours_customizations.deduction_tiers import compile_deduction_tiers
+from fours_customizations.overtime_tiers import compile_rate_table
+from fours_customizations.rate_versions import RATE_FIELDS, compile_rate_versions, has_versioned_rate
+from fours_customizations.replica import on_replica
+
+CACHE_KEY = 'fours_resolved_policy'
+
+# Time fields, where 00:00 is a value; the others are unset when empty or 0
+TIME_FIELDS = ['overtime_start_time', 'overtime_end_time']
+
+# Fields that can be set at any level; the first level with a value wins
+POLICY_FIELDS = [
+	'absent_deduction',
+	'late_deduction',
+	'early_exit_deduction',
+	'no_checkout_deduction',
+	'derive_attendance_flags',
+	'overtime_start_time',
+	'overtime_end_time',
+	'overtime_from_shift_end',
+	'overtime_hourly_rate',
+	'holiday_overtime_multiplier',
+	'weekly_off_overtime_multiplier',
+	'monthly_overtime_hour_cap',
+	'rolling_violation_type',
+	'rolling_window_days',
+	'rolling_violation_threshold',
+	'rolling_violation_penalty'
+]
+
+
+def resolve_policy(employee):
+	"""
+	Get the attendance policy that applies to an employee.
+
+	The resolved policy is cached in Redis, so after the first slip each lookup is a
+	single hash read regardless of how many levels were consulted.
+
+	Returns:
+		frappe._dict: Policy fields plus employee, designation, department, company,
+		holiday_list, default_shift, overtime_tiers, the compiled overtime rate_table, the
+		compiled deduction_tiers and the compiled rate_versions
+	"""
+	policy = frappe.cache().hget(CACHE_KEY, employee)
+
+	if policy is None:
+		policy = _build_policy(employee)
+		# Replica reads may lag behind the invalidation hooks, so don't cache them
+		if not on_replica():
+			frappe.cache().hset(CACHE_KEY, employee, policy)
+
+	return policy
+
+
+def _build_policy(employee):
+	"""Read every level once and merge them into a flat policy"""
+	emp = frappe.db.get_value(
+		'Employee',
+		employee,
+		['name', 'designation', 'department', 'company', 'holiday_list', 'default_shift', *POLICY_FIELDS],
+		as_dict=True
+	)
+
+	designation = frappe.get_doc('Designation', emp.designation) if emp.designation else None
+	department = _get_level_values('Department', emp.department)
+	company = _get_level_values('Company', emp.company, ['default_holiday_list'])
+
+	levels = [emp, designation.as_dict() if designation else {}, department, company]
+
+	policy = frappe._dict({
+		'employee': emp.name,
+		'designation': emp.designation,
+		'department': emp.department,
+		'company': emp.company,
+		'holiday_list': emp.holiday_list or company.get('default_holiday_list'),
+		'default_shift': emp.default_shift
+	})
+
+	for fieldname in POLICY_FIELDS:
+		policy[fieldname] = next((level.get(fieldname) for level in levels if _is_set(level, fieldname)), None)
+
+	for fieldname in RATE_FIELDS:
+		policy[fieldname] = policy[fieldname] or 0
+
+	# Effective-dated rates from the Designation, under the Employee's own overrides
+	policy.rate_versions = compile_rate_versions(
+		[row.as_dict() for row in designation.get('rate_versions') or []] if designation else None,
+		policy,
+		[fieldname for fieldname in RATE_FIELDS if emp.get(fieldname)]
+	)
+
+	# Tiers stay on the Designation but follow the resolved overtime window
+	policy.overtime_tiers = [
+		{'from_time': tier.from_time, 'rate_multiplier': tier.rate_multiplier}
+		for tier in (designation.get('overtime_tiers') if designation else None) or []
+	]
+
+	policy.deduction_tiers = compile_deduction_tiers(
+		[tier.as_dict() for tier in designation.get('deduction_tiers')] if designation else None
+	)
+
+	policy.rate_table = None
+	if policy.overtime_start_time is not None and policy.overtime_end_time is not None:
+		policy.rate_table = compile_rate_table(
+			policy.overtime_start_time,
+			policy.overtime_end_time,
+			policy.overtime_tiers
+		)
+
+	return policy
+
+
+def _is_set(level, fieldname):
+	"""Check whether a level sets a field; Time fields load as timedelta and 00:00 is falsy"""
+	if fieldname in TIME_FIELDS:
+		return level.get(fieldname) is not None
+	return bool(level.get(fieldname))
+
+
+def _get_level_values(doctype, name, extra_fields=None):
+	"""Get the policy override values set on a Department or Company"""
+	if not name:
+		return {}
+
+	return frappe.db.get_value(doctype, name, [*POLICY_FIELDS, *(extra_fields or [])], as_dict=True) or {}
+
+
+def has_overtime_policy(policy):
+	"""Check whether a resolved policy has a complete overtime configuration"""
+	return bool(
+		policy.overtime_start_time is not None
+		and policy.overtime_end_time is not None
+		and (policy.overtime_hourly_rate or has_versioned_rate(policy, 'overtime_hourly_rate'))
+	)
+
+
+def invalidate_employee_policy(doc, method=None):
+	"""Drop the cached policy of an Employee that changed"""
+	frappe.cache().hdel(CACHE_KEY, doc.name)
+
+
+def invalidate_all_policies(doc=None, method=None):
+	"""Drop every cached policy when a Designation, Department or Company changes"""
+	frappe.cache().delete_key(CACHE_KEY)
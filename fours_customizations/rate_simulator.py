@@ -0,0 +1,217 @@
+"""
+What-if rate simulation for Fours Customizations
+Caches a period's employee x violation count matrix and rate-free overtime units once,
+then re-prices the whole company under proposed Designation rates without reading attendance
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now_datetime
+
+from fours_customizations.attendance_query import iter_attendance_with_policy, iter_employee_groups
+from fours_customizations.deduction_tiers import price_occurrences
+from fours_customizations.leave_calendar import get_leave_dates
+from fours_customizations.money import ROUNDING_PERIOD, div_round, from_minor, get_overtime_rounding, to_minor
+from fours_customizations.overtime_utils import OVERTIME_DENOMINATOR, apply_monthly_cap, price_overtime_day
+from fours_customizations.policy import resolve_policy
+from fours_customizations.rate_versions import RATE_FIELDS, get_rates_on
+from fours_customizations.replica import use_read_replica
+from fours_customizations.salary_slip_handler import VIOLATION_TYPES, classify_attendance
+from fours_customizations.shift_schedule import load_shift_schedule
+
+CACHE_KEY = 'fours_rate_matrix'
+DEFAULT_CACHE_SECONDS = 3600
+
+
+@frappe.whitelist()
+def simulate_rates(start_date, end_date, proposed_rates, company=None, refresh=False):
+	"""
+	Re-price a period's deductions and overtime under proposed Designation rates.
+
+	The count matrix is built once per company and period and cached in Redis for
+	`fours_simulation_cache_seconds` (default 3600); each scenario after that is only
+	arithmetic over the cached counts. A proposed rate applies to every employee of the
+	designation unless the Employee record overrides that rate itself. Current rates are
+	those in effect at the end of the period, and each scenario prices the whole period at
+	one rate, so Designation rate versions within the period are not followed.
+
+	Args:
+		start_date (str/date): Start date of the period
+		end_date (str/date): End date of the period
+		proposed_rates (dict/str): Designation -> {rate field: proposed rate}
+		company (str): Optional company to restrict to
+		refresh (bool): Rebuild the cached matrix first
+
+	Returns:
+		dict: {'built_at', 'totals', 'by_designation', 'by_employee'}, each with current,
+		proposed and delta deductions and overtime; by_employee lists changed employees only
+	"""
+	# Company-wide pay figures and a full attendance scan: HR only, not every slip reader
+	frappe.only_for(['HR Manager', 'HR User'])
+
+	proposed_rates = frappe.parse_json(proposed_rates) or {}
+	for rates in proposed_rates.values():
+		unknown = set(rates) - set(RATE_FIELDS)
+		if unknown:
+			frappe.throw(_('Cannot simulate {0}. Allowed rates: {1}').format(', '.join(unknown), ', '.join(RATE_FIELDS)))
+
+	matrix = get_count_matrix(start_date, end_date, company=company, refresh=cint(refresh))
+
+	totals = _empty_totals()
+	by_designation = {}
+	by_employee = []
+
+	for employee, row in matrix['employees'].items():
+		scenario = proposed_rates.get(row['designation']) or {}
+		rates = {
+			fieldname: row['rates'][fieldname] if fieldname in row['overrides'] else scenario.get(fieldname, row['rates'][fieldname])
+			for fieldname in RATE_FIELDS
+		}
+
+		current = _price_row(matrix, row, row['rates'])
+		proposed = current if rates == row['rates'] else _price_row(matrix, row, rates)
+
+		for bucket in [totals, by_designation.setdefault(row['designation'], _empty_totals())]:
+			_add_to_totals(bucket, current, proposed)
+
+		if proposed != current:
+			by_employee.append({
+				'employee': employee,
+				'designation': row['designation'],
+				**_format_totals(_add_to_totals(_empty_totals(), current, proposed))
+			})
+
+	return {
+		'built_at': matrix['built_at'],
+		'totals': _format_totals(totals),
+		'by_designation': {designation: _format_totals(bucket) for designation, bucket in by_designation.items()},
+		'by_employee': by_employee
+	}
+
+
+def get_count_matrix(start_date, end_date, company=None, refresh=False):
+	"""
+	Get the cached count matrix of a company and period, building it on first use.
+
+	Returns:
+		dict: {
+			'built_at': datetime,
+			'deduction_tiers': {designation: compiled deduction tiers},
+			'employees': {employee: {
+				'designation', 'rates': {rate field: resolved rate},
+				'overrides': [rate fields set on the Employee itself],
+				'counts': {violation key: count},
+				'overtime_units': [per-day overtime in minor units x OVERTIME_DENOMINATOR per unit of rate]
+			}}
+		}
+	"""
+	key = f'{CACHE_KEY}|{company or ""}|{getdate(start_date)}|{getdate(end_date)}'
+	matrix = None if refresh else frappe.cache().get_value(key)
+
+	if matrix is None:
+		matrix = _build_count_matrix(start_date, end_date, company)
+		expires_in_sec = cint(frappe.conf.get('fours_simulation_cache_seconds')) or DEFAULT_CACHE_SECONDS
+		frappe.cache().set_value(key, matrix, expires_in_sec=expires_in_sec)
+
+	return matrix
+
+
+@use_read_replica
+def _build_count_matrix(start_date, end_date, company):
+	"""Count every employee's violations and overtime units in one streamed pass"""
+	filters = {'company': company} if company else {}
+	employees = frappe.get_all('Employee', filters=filters, fields=['name', *RATE_FIELDS], order_by='name')
+	matrix = {'built_at': now_datetime(), 'deduction_tiers': {}, 'employees': {}}
+
+	for group in iter_employee_groups(employees):
+		leave_dates = get_leave_dates([emp.name for emp in group], start_date, end_date)
+		shift_schedule = load_shift_schedule([emp.name for emp in group], start_date, end_date)
+		policies = {}
+		unit_policies = {}
+		running_totals = {}
+
+		for emp in group:
+			policy = policies[emp.name] = resolve_policy(emp.name)
+			# Priced at one minor unit per hour, so amounts are per unit of rate
+			unit_policies[emp.name] = frappe._dict(policy, overtime_hourly_rate=from_minor(1), rate_versions=None)
+			current_rates = get_rates_on(policy, end_date)
+			matrix['deduction_tiers'].setdefault(policy.designation, policy.deduction_tiers)
+			matrix['employees'][emp.name] = {
+				'designation': policy.designation,
+				'rates': {fieldname: current_rates[fieldname] or 0 for fieldname in RATE_FIELDS},
+				'overrides': [fieldname for fieldname in RATE_FIELDS if emp.get(fieldname)],
+				'counts': {key: 0 for key in VIOLATION_TYPES},
+				'overtime_units': []
+			}
+
+		for att, policy in iter_attendance_with_policy(
+			[emp.name for emp in group],
+			start_date,
+			end_date,
+			fields=['employee', 'status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit'],
+			policies=policies
+		):
+			row = matrix['employees'][att.employee]
+
+			for key in classify_attendance(policy, att, leave_dates.get(att.employee, set()), shift_schedule=shift_schedule):
+				row['counts'][key] += 1
+
+			if policy.rate_table and att.status in ['Present', 'Half Day'] and att.out_time:
+				units = _get_overtime_units(unit_policies[att.employee], att, shift_schedule, running_totals.setdefault(att.employee, {}))
+				if units:
+					row['overtime_units'].append(units)
+
+	return matrix
+
+
+def _get_overtime_units(unit_policy, att, shift_schedule, running_total):
+	"""A day's paid overtime, after the monthly cap, priced at one minor unit per hour"""
+	entry = price_overtime_day(unit_policy, att, shift_schedule)
+	if not entry:
+		return 0
+
+	# The cap cuts hours, which don't depend on the rate being simulated
+	return apply_monthly_cap(unit_policy, entry, running_total)['overtime_amount_exact']
+
+
+def _price_row(matrix, row, rates):
+	"""Price one employee's counts and overtime units under a set of rates, in minor units"""
+	tiers = matrix['deduction_tiers'].get(row['designation']) or {}
+
+	deductions = sum(
+		price_occurrences(row['counts'][key], to_minor(rates[rate_field]), tiers.get(key))
+		for key, (component_name, rate_field) in VIOLATION_TYPES.items()
+	)
+
+	rate_minor = to_minor(rates['overtime_hourly_rate'])
+	if get_overtime_rounding() == ROUNDING_PERIOD:
+		overtime = div_round(rate_minor * sum(row['overtime_units']), OVERTIME_DENOMINATOR)
+	else:
+		overtime = sum(div_round(rate_minor * units, OVERTIME_DENOMINATOR) for units in row['overtime_units'])
+
+	return (deductions, overtime)
+
+
+def _empty_totals():
+	return {'current_deductions': 0, 'proposed_deductions': 0, 'current_overtime': 0, 'proposed_overtime': 0}
+
+
+def _add_to_totals(totals, current, proposed):
+	totals['current_deductions'] += current[0]
+	totals['proposed_deductions'] += proposed[0]
+	totals['current_overtime'] += current[1]
+	totals['proposed_overtime'] += proposed[1]
+	return totals
+
+
+def _format_totals(totals):
+	"""Convert minor-unit totals to amounts and add the deltas"""
+	result = {fieldname: from_minor(value) for fieldname, value in totals.items()}
+	result['deductions_delta'] = from_minor(totals['proposed_deductions'] - totals['current_deductions'])
+	result['overtime_delta'] = from_minor(totals['proposed_overtime'] - totals['current_overtime'])
+	# Change in what the company pays: more overtime, less deducted
+	result['net_pay_delta'] = from_minor(
+		(totals['proposed_overtime'] - totals['current_overtime'])
+		- (totals['proposed_deductions'] - totals['current_deductions'])
+	)
+	return result
@@ -0,0 +1,100 @@
+"""
+Effective-dated Designation rates for Fours Customizations
+Rate versions are compiled into a sorted date array with the policy; a day's rates are one bisect away
+"""
+
+from bisect import bisect_right
+
+from frappe.utils import getdate
+
+from fours_customizations.money import to_minor
+
+# Rates a Designation Rate Version can change
+RATE_FIELDS = [
+	'absent_deduction',
+	'late_deduction',
+	'early_exit_deduction',
+	'no_checkout_deduction',
+	'overtime_hourly_rate'
+]
+
+# Designation Rate Version 'Empty Rates' option that makes empty rates 0
+EMPTY_RATES_ZERO = 'Set to Zero'
+
+
+def compile_rate_versions(versions, base_rates, overrides=None):
+	"""
+	Compile Designation Rate Version rows into parallel sorted arrays.
+
+	Each version is resolved in full up front: an empty rate carries over from the
+	previous version (the base rate for the first), unless the row's Empty Rates is
+	'Set to Zero', since Currency fields store an empty rate as 0. Rates the Employee
+	overrides itself are never versioned.
+
+	Args:
+		versions (list): Designation Rate Version rows
+		base_rates (dict): Resolved rates without versions
+		overrides (list): Rate fields set on the Employee record
+
+	Returns:
+		dict: {'dates': sorted ISO dates, 'rates': {rate field: rate} per date}, or None without versions
+	"""
+	versions = sorted(
+		(row for row in versions or [] if row.get('effective_from')),
+		key=lambda row: getdate(row.get('effective_from'))
+	)
+	if not versions:
+		return None
+
+	compiled = {'dates': [], 'rates': []}
+	previous = base_rates
+
+	for row in versions:
+		empty_rate = 0 if row.get('empty_rates') == EMPTY_RATES_ZERO else None
+		rates = {
+			fieldname: base_rates[fieldname] if fieldname in (overrides or []) else _get_version_rate(row, fieldname, empty_rate, previous)
+			for fieldname in RATE_FIELDS
+		}
+		previous = rates
+
+		effective_from = str(getdate(row.get('effective_from')))
+		if compiled['dates'] and compiled['dates'][-1] == effective_from:
+			# Two rows for the same date: the later row wins
+			compiled['rates'][-1] = rates
+		else:
+			compiled['dates'].append(effective_from)
+			compiled['rates'].append(rates)
+
+	return compiled
+
+
+def _get_version_rate(row, fieldname, empty_rate, previous):
+	"""A version's rate; an empty one is `empty_rate`, or the previous rate when that is None"""
+	if row.get(fieldname):
+		return row.get(fieldname)
+	return previous[fieldname] if empty_rate is None else empty_rate
+
+
+def get_rates_on(policy, attendance_date):
+	"""
+	Get the rates in effect on a day, by bisecting the policy's compiled versions.
+
+	Returns:
+		dict: Rate field -> rate; the policy itself before the first version or without versions
+	"""
+	versions = policy.rate_versions
+	if not versions:
+		return policy
+
+	index = bisect_right(versions['dates'], str(getdate(attendance_date))) - 1
+	return versions['rates'][index] if index >= 0 else policy
+
+
+def has_versioned_rate(policy, fieldname):
+	"""Check whether any rate version has a non-zero rate for a field"""
+	return bool(policy.rate_versions and any(rates[fieldname] for rates in policy.rate_versions['rates']))
+
+
+def get_occurrence_rates(policy, rate_field, dates):
+	"""Base rate in minor units of each occurrence, as in effect on its date"""
+	return [to_minor(get_rates_on(policy, attendance_date)[rate_field]) for attendance_date in dates]
@@ -0,0 +1,31 @@
+"""
+Redis set helpers for Fours Customizations
+Dirty sets are drained atomically, so marks added while a pass runs are kept for the next one
+"""
+
+import frappe
+
+
+def take_members(key):
+	"""
+	Remove and return every member of a Redis set in one MULTI / EXEC.
+
+	Unlike reading the members and removing them after the work is done, a member added
+	again meanwhile stays in the set for the next reader.
+
+	Returns:
+		set: Decoded members
+	"""
+	cache = frappe.cache()
+	pipeline = cache.pipeline()
+	pipeline.smembers(cache.make_key(key))
+	pipeline.delete(cache.make_key(key))
+	members, _deleted = pipeline.execute()
+
+	return {frappe.safe_decode(member) for member in members}
+
+
+def restore_members(key, members):
+	"""Put taken members back, e.g. when the pass that took them failed"""
+	if members:
+		frappe.cache().sadd(key, *members)
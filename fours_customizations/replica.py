@@ -0,0 +1,71 @@
+"""
+Read-replica routing for Fours Customizations
+Runs read-only attendance scans on Frappe's replica connection, falling back to the primary
+"""
+
+import functools
+
+import frappe
+
+
+def use_read_replica(fn):
+	"""
+	Run a read-only function on the read replica when the site has one.
+
+	Uses Frappe's replica settings (`read_from_replica` and `replica_host` in
+	site_config.json). Stays on the primary when the replica can't be reached, and when
+	called from a slip-mutating path (slip locks held or writes pending in the
+	transaction) so those never read data older than their own writes.
+	"""
+	@functools.wraps(fn)
+	def wrapper(*args, **kwargs):
+		switched = _switch_to_replica()
+
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			if switched:
+				_switch_to_primary()
+
+	return wrapper
+
+
+def on_replica():
+	"""Check whether the current connection is the read replica"""
+	return bool(getattr(frappe.local, 'primary_db', None))
+
+
+def _switch_to_replica():
+	if not frappe.conf.read_from_replica or on_replica():
+		return False
+
+	if getattr(frappe.local, 'fours_slip_locks', None) or frappe.db.transaction_writes:
+		return False
+
+	try:
+		if not frappe.connect_replica():
+			return False
+		# Connect now so an unreachable replica falls back here instead of failing mid-scan
+		frappe.local.db.connect()
+	except Exception:
+		_switch_to_primary()
+		frappe.logger().warning('Read replica unavailable, reading from the primary', exc_info=True)
+		return False
+
+	return True
+
+
+def _switch_to_primary():
+	primary_db = getattr(frappe.local, 'primary_db', None)
+	if not primary_db:
+		return
+
+	try:
+		frappe.local.db.close()
+	except Exception:
+		pass
+
+	frappe.local.db = primary_db
+	del frappe.local.primary_db
+	if hasattr(frappe.local, 'replica_db'):
+		del frappe.local.replica_db
@@ -0,0 +1,159 @@
+"""
+Rolling-window violation counters for Fours Customizations
+Per-employee day buckets kept in Redis and updated on Attendance submit / cancel,
+so trailing-window rules don't need extra wide-range attendance scans at slip time
+"""
+
+import functools
+
+import frappe
+from frappe.utils import add_days, cint, getdate, today
+
+from fours_customizations.attendance_query import attendance_row_from_doc, iter_attendance
+from fours_customizations.deduction_tiers import VIOLATION_TYPE_KEYS
+from fours_customizations.leave_calendar import get_leave_dates
+from fours_customizations.replica import on_replica
+from fours_customizations.shift_schedule import load_shift_schedule
+
+CACHE_KEY = 'fours_violation_days'
+
+# Day buckets older than this are dropped; longer windows reload from the database
+DEFAULT_RETENTION_DAYS = 120
+
+
+def get_rolling_penalty(policy, end_date):
+	"""
+	Check the policy's trailing-window rule for the window ending on end_date.
+
+	Returns:
+		dict: {'violation_type', 'window_days', 'threshold', 'count', 'penalty'}, or None
+		when the policy has no rolling rule
+	"""
+	violation_key = VIOLATION_TYPE_KEYS.get(policy.rolling_violation_type)
+	window_days = cint(policy.rolling_window_days)
+
+	if not violation_key or window_days <= 0 or not policy.rolling_violation_penalty:
+		return None
+
+	count = count_in_window(policy, violation_key, end_date, window_days)
+	threshold = cint(policy.rolling_violation_threshold)
+
+	return {
+		'violation_type': violation_key,
+		'window_days': window_days,
+		'threshold': threshold,
+		'count': count,
+		'penalty': policy.rolling_violation_penalty if count > threshold else 0
+	}
+
+
+def count_in_window(policy, violation_key, end_date, window_days):
+	"""Count an employee's violations of one type in the window_days ending on end_date"""
+	end_date = getdate(end_date)
+	start_date = add_days(end_date, -(window_days - 1))
+	buckets = _get_buckets(policy, start_date, end_date)
+
+	count = 0
+	for offset in range(window_days):
+		day = str(add_days(start_date, offset))
+		for violation_types in buckets['days'].get(day, {}).values():
+			if violation_key in violation_types:
+				count += 1
+
+	return count
+
+
+def _get_buckets(policy, start_date, end_date):
+	"""Get the employee's day buckets, loading any days before start_date not yet cached"""
+	buckets = frappe.cache().hget(CACHE_KEY, policy.employee)
+	start = str(start_date)
+
+	if buckets is None:
+		buckets = {'since': start, 'days': {}}
+		_load_days(policy, buckets, start_date, max(getdate(end_date), getdate(today())))
+	elif buckets['since'] > start:
+		_load_days(policy, buckets, start_date, add_days(buckets['since'], -1))
+		buckets['since'] = start
+	else:
+		return buckets
+
+	# Replica reads may lag behind submits the hooks already counted, so don't cache them
+	if not on_replica():
+		frappe.cache().hset(CACHE_KEY, policy.employee, buckets)
+
+	return buckets
+
+
+def _load_days(policy, buckets, start_date, end_date):
+	"""Fill buckets from submitted attendance in one streamed range read"""
+	leave_dates = get_leave_dates([policy.employee], start_date, end_date).get(policy.employee, set())
+	shift_schedule = load_shift_schedule([policy.employee], start_date, end_date) if policy.derive_attendance_flags else None
+
+	for att in iter_attendance(
+		[policy.employee],
+		start_date,
+		end_date,
+		fields=['status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit']
+	):
+		buckets['days'].setdefault(str(att.attendance_date), {})[att.name] = _classify(policy, att, leave_dates, shift_schedule)
+
+
+def _classify(policy, att, leave_dates, shift_schedule=None):
+	# Imported here to avoid a circular import with the handler
+	from fours_customizations.salary_slip_handler import classify_attendance
+
+	return classify_attendance(policy, att, leave_dates, shift_schedule=shift_schedule)
+
+
+def update_counters(doc, method=None):
+	"""
+	Attendance on_submit / on_cancel: add or remove the row from its day bucket.
+
+	Applied once the transaction commits, so a submit or cancel that rolls back never
+	reaches the buckets. Employees without cached buckets are skipped; they are loaded
+	on first use.
+	"""
+	frappe.db.after_commit.add(functools.partial(_apply_to_buckets, doc))
+
+
+def _apply_to_buckets(doc):
+	from fours_customizations.policy import resolve_policy
+
+	buckets = frappe.cache().hget(CACHE_KEY, doc.employee)
+	day = str(getdate(doc.attendance_date))
+
+	if buckets is None or day < buckets['since']:
+		return
+
+	if doc.docstatus == 1:
+		policy = resolve_policy(doc.employee)
+		leave_dates = get_leave_dates([doc.employee], day, day).get(doc.employee, set()) if doc.status == 'Absent' else set()
+		shift_schedule = load_shift_schedule([doc.employee], day, day) if policy.derive_attendance_flags else None
+		buckets['days'].setdefault(day, {})[doc.name] = _classify(policy, attendance_row_from_doc(doc), leave_dates, shift_schedule)
+	else:
+		buckets['days'].get(day, {}).pop(doc.name, None)
+
+	_prune(buckets)
+	frappe.cache().hset(CACHE_KEY, doc.employee, buckets)
+
+
+def _prune(buckets):
+	"""Drop day buckets past the retention period (`fours_rolling_retention_days`)"""
+	retention_days = cint(frappe.conf.get('fours_rolling_retention_days')) or DEFAULT_RETENTION_DAYS
+	cutoff = str(add_days(today(), -retention_days))
+
+	if buckets['since'] >= cutoff:
+		return
+
+	buckets['days'] = {day: entries for day, entries in buckets['days'].items() if day >= cutoff}
+	buckets['since'] = cutoff
+
+
+def invalidate_employee_counters(doc, method=None):
+	"""Employee changed, or their attendance was written without hooks: rebuild on next use"""
+	frappe.cache().hdel(CACHE_KEY, doc.name)
+
+
+def invalidate_all_counters(doc=None, method=None):
+	"""Flag derivation settings or shifts changed: rebuild buckets on next use"""
+	frappe.cache().delete_key(CACHE_KEY)
@@ -3,20 +3,56 @@ Salary Slip Handler for Fours Customizations
 Automatically calculates attendance-based deductions and overtime
 """
 
+import hashlib
+
 import frappe
 from frappe import _
+from frappe.utils import add_to_date, cint, get_datetime, getdate, now_datetime
+
+from fours_customizations.attendance_flags import derive_flags, get_shift_windows
+from fours_customizations.attendance_query import iter_attendance
+from fours_customizations.deduction_tiers import price_dated_occurrences
+from fours_customizations.holiday_calendar import get_year_bitmaps
+from fours_customizations.leave_calendar import get_leave_dates, get_slip_leave_dates, is_excused_absence
+from fours_customizations.money import from_minor, get_money_precision, to_minor
+from fours_customizations.overtime_utils import (
+	get_cap_carry_in,
+	pack_overtime_day,
+	price_overtime_day,
+	summarize_overtime,
+	unpack_overtime_day,
+)
+from fours_customizations.policy import POLICY_FIELDS, has_overtime_policy, resolve_policy
+from fours_customizations.rate_versions import get_occurrence_rates, get_rates_on
+from fours_customizations.replica import use_read_replica
+from fours_customizations.rolling_counters import get_rolling_penalty
+from fours_customizations.shift_schedule import get_scheduled_shift, load_shift_schedule, needs_shift_schedule
+from fours_customizations.slip_components import acquire_slip_lock, upsert_component
+from fours_customizations.slip_snapshot import get_snapshot_state
+
+DEFAULT_DATES_LIMIT = 100
+
+# Delta recomputation re-reads rows modified this long before the previous computation
+DELTA_OVERLAP_SECONDS = 300
+
+# Violation type -> (salary component, policy rate field)
+VIOLATION_TYPES = {
+	'absent': ('Absent Deduction', 'absent_deduction'),
+	'late': ('Late Deduction', 'late_deduction'),
+	'early_exit': ('Early Exit Deduction', 'early_exit_deduction'),
+	'no_checkout': ('No Checkout Deduction', 'no_checkout_deduction')
+}
 
 
 def calculate_and_add_deductions(doc, method=None):
 	"""
-	Calculate attendance-based deductions and add them to salary slip.
-	This function should be called via Server Script or doc_events hook.
+	Recalculate a draft salary slip, including attendance deductions and overtime.
 
-	Works with both:
-	- Manual salary slip creation
-	- Bulk creation via Payroll Entry
+	Salary Slips use FoursSalarySlip (see overrides.py), which adds the components while
+	HRMS calculates the slip, so saving is enough. This remains for Server Scripts and
+	custom code written against earlier versions.
 
-	Usage in Server Script (Salary Slip - Before Insert AND Before Save):
+	Usage in Server Script (Salary Slip - Before Save):
 		from fours_customizations.salary_slip_handler import calculate_and_add_deductions
 		calculate_and_add_deductions(doc)
 	"""
@@ -25,209 +61,367 @@ def calculate_and_add_deductions(doc, method=None):
 	if doc.docstatus != 0:
 		return
 
-	if not doc.employee or not doc.start_date or not doc.end_date:
-		return
-
 	# Don't run if salary structure hasn't been loaded yet
 	# (earnings should have at least one component from the structure)
-	if not doc.earnings or len(doc.earnings) == 0:
+	if not doc.earnings:
 		return
 
-	# Check if we've already processed this slip (to avoid duplicate processing)
-	if hasattr(doc, '_deductions_calculated'):
-		return
+	doc.calculate_net_pay()
 
-	# Mark as processed
-	doc._deductions_calculated = True
 
-	try:
-		# Get employee designation
-		employee = frappe.get_doc('Employee', doc.employee)
+def get_slip_adjustments(doc):
+	"""
+	Compute a salary slip's attendance deductions and overtime.
 
-		if not employee.designation:
-			return
+	Takes the slip's advisory lock first, so concurrent calculations of the same slip
+	are serialized until the transaction ends.
 
-		# Get designation with deduction rates
-		designation = frappe.get_doc('Designation', employee.designation)
-	except Exception as e:
-		frappe.log_error(f"Error loading employee/designation: {str(e)}", "Salary Slip Handler")
-		return
+	Returns:
+		dict: Result of compute_attendance_adjustments, or None when the slip isn't eligible
+	"""
+	if doc.docstatus == 2:
+		return None
 
-	# Get attendance records for the period
-	attendance_records = frappe.get_all(
-		'Attendance',
-		filters={
-			'employee': doc.employee,
-			'attendance_date': ['between', [doc.start_date, doc.end_date]],
-			'docstatus': 1  # Only submitted attendance
-		},
-		fields=['name', 'status', 'in_time', 'out_time', 'late_entry', 'early_exit']
+	if not doc.employee or not doc.start_date or not doc.end_date:
+		return None
+
+	try:
+		# Resolve deduction rates Employee -> Designation -> Department -> Company
+		policy = resolve_policy(doc.employee)
+	except Exception as e:
+		frappe.log_error(f"Error resolving attendance policy: {e!s}", "Salary Slip Handler")
+		return None
+
+	acquire_slip_lock(doc.employee, doc.start_date)
+
+	# One pass over the period's attendance for deductions and overtime
+	computation = compute_attendance_adjustments(
+		doc.employee,
+		doc.start_date,
+		doc.end_date,
+		policy,
+		leave_dates=get_slip_leave_dates(doc),
+		previous_state=get_snapshot_state(doc),
+		keep_state=True
 	)
 
-	# Count violations
-	absent_count = 0
-	late_count = 0
-	early_exit_count = 0
-	no_checkout_count = 0
-
-	for att in attendance_records:
-		# Count absences
-		if att.status == 'Absent':
-			absent_count += 1
-
-		# Count late entries
-		if att.late_entry == 1:
-			late_count += 1
-
-		# Count early exits
-		if att.early_exit == 1:
-			early_exit_count += 1
-
-		# Count no checkout (present but no out_time)
-		if att.status in ['Present', 'Half Day'] and not att.out_time:
-			no_checkout_count += 1
-
-	# Calculate deduction amounts
-	deductions_map = {
-		'Absent Deduction': {
-			'count': absent_count,
-			'rate': designation.absent_deduction or 0,
-			'amount': absent_count * (designation.absent_deduction or 0)
-		},
-		'Late Deduction': {
-			'count': late_count,
-			'rate': designation.late_deduction or 0,
-			'amount': late_count * (designation.late_deduction or 0)
-		},
-		'Early Exit Deduction': {
-			'count': early_exit_count,
-			'rate': designation.early_exit_deduction or 0,
-			'amount': early_exit_count * (designation.early_exit_deduction or 0)
-		},
-		'No Checkout Deduction': {
-			'count': no_checkout_count,
-			'rate': designation.no_checkout_deduction or 0,
-			'amount': no_checkout_count * (designation.no_checkout_deduction or 0)
+	# Log what was calculated (for debugging)
+	frappe.logger().info(f"Calculated deductions for {doc.employee}: {computation['total_deductions']}")
+
+	return computation
+
+
+def apply_slip_adjustments(doc, computation, table):
+	"""
+	Set the app-managed components of one slip table from a computation.
+
+	Rows are fixed amounts that don't depend on payment days, so HRMS totals them as they are.
+
+	Args:
+		doc: Salary Slip document
+		computation (dict): Result of get_slip_adjustments
+		table (str): 'earnings' or 'deductions'
+	"""
+	if table == 'deductions':
+		# Add or update deduction components in salary slip
+		for key, (component_name, _rate_field) in VIOLATION_TYPES.items():
+			upsert_component(doc, 'deductions', component_name, computation['violations'][key]['amount'])
+
+		rolling_penalty = computation['rolling_penalty']
+		upsert_component(doc, 'deductions', 'Rolling Violation Penalty', rolling_penalty['penalty'] if rolling_penalty else 0)
+
+	elif table == 'earnings':
+		# Add overtime if configured
+		upsert_component(doc, 'earnings', 'Designation Overtime Pay', computation['overtime']['total_amount'])
+
+
+def compute_attendance_adjustments(employee, start_date, end_date, policy=None, dates_limit=None, leave_dates=None, previous_state=None, keep_state=False):
+	"""
+	Count violations and price overtime for an employee in one pass over the period's attendance.
+
+	At most `dates_limit` dates are kept per violation type (`fours_summary_dates_limit`
+	in site_config.json, default 100); counts and amounts always cover the whole period.
+	Absences on approved leave (`leave_dates`, read when not given) or on a holiday are
+	not counted.
+
+	Attendance is streamed and only the totals are held, unless `keep_state` is set (the
+	slip path): then each row's contribution is kept, compactly encoded, as `state` for the
+	next delta computation. With the `previous_state` of an earlier computation (stored in
+	the slip snapshot), only attendance modified since then is read and applied on top of
+	it, as long as the policy, leave, shifts and holidays it was computed with are unchanged.
+
+	Returns:
+		dict: {
+			'policy': resolved policy,
+			'violations': {type: {'count', 'rate', 'amount', 'dates', 'dates_truncated'}},
+			'total_deductions': float (including any rolling-window penalty),
+			'rolling_penalty': result of get_rolling_penalty, or None,
+			'overtime': result in the shape of calculate_designation_overtime,
+			'fingerprint': hash of the computation basis and every attendance row used,
+			'state': per-row contributions for the next delta computation, or None without keep_state
 		}
-	}
+	"""
+	dates_limit = cint(dates_limit or frappe.conf.get('fours_summary_dates_limit')) or DEFAULT_DATES_LIMIT
+	policy = policy or resolve_policy(employee)
+
+	if leave_dates is None:
+		leave_dates = get_leave_dates([employee], start_date, end_date).get(employee, set())
+
+	# Optionally classify late entries / early exits that Attendance doesn't flag
+	shift_windows = get_shift_windows() if policy.derive_attendance_flags else None
+
+	# Shift assignments for overtime from the shift end, one query for the whole period
+	shift_schedule = load_shift_schedule([employee], start_date, end_date) if needs_shift_schedule(policy) else None
+
+	computed_at = now_datetime()
+	period = [employee, str(getdate(start_date)), str(getdate(end_date))]
+	basis = _get_computation_basis(policy, start_date, end_date, leave_dates, shift_windows, shift_schedule)
+
+	state = None
+	if keep_state:
+		rows = None
+		if previous_state and previous_state.get('period') == period and previous_state.get('basis') == basis:
+			rows = _apply_attendance_changes(policy, employee, start_date, end_date, leave_dates, shift_windows, shift_schedule, previous_state)
+
+		if rows is None:
+			rows = {
+				att.name: _pack_row(get_row_contribution(policy, att, leave_dates, shift_windows, shift_schedule))
+				for att in _iter_period_attendance(employee, start_date, end_date)
+			}
+
+		state = {'period': period, 'basis': basis, 'computed_at': str(computed_at), 'rows': rows}
+		contributions = (
+			(name, _unpack_row(name, packed))
+			for name, packed in sorted(rows.items(), key=lambda row: (row[1][0], row[0]))
+		)
+	else:
+		# Already in (attendance_date, name) order
+		contributions = (
+			(att.name, get_row_contribution(policy, att, leave_dates, shift_windows, shift_schedule))
+			for att in _iter_period_attendance(employee, start_date, end_date)
+		)
 
-	# Add or update deduction components in salary slip
-	for component_name, deduction_data in deductions_map.items():
-		if deduction_data['amount'] > 0:
-			# Check if component already exists
-			existing_component = None
-			for ded in doc.deductions:
-				if ded.salary_component == component_name:
-					existing_component = ded
-					break
-
-			if existing_component:
-				# Update existing
-				existing_component.amount = deduction_data['amount']
-			else:
-				# Add new
-				doc.append('deductions', {
-					'salary_component': component_name,
-					'amount': deduction_data['amount']
-				})
-
-	# Calculate and add overtime if configured
-	if hasattr(designation, 'overtime_start_time') and designation.overtime_start_time:
-		from fours_customizations.overtime_utils import calculate_designation_overtime
-
-		overtime_data = calculate_designation_overtime(
-			doc.employee,
-			doc.start_date,
-			doc.end_date
+	# Rates shown are those in effect at the end of the period
+	end_rates = get_rates_on(policy, end_date)
+	violations = {
+		key: {'count': 0, 'rate': end_rates[rate_field], 'dates': []}
+		for key, (component_name, rate_field) in VIOLATION_TYPES.items()
+	}
+	occurrence_dates = {key: [] for key in VIOLATION_TYPES}
+	overtime_days = []
+	fingerprint = hashlib.sha1(basis.encode())
+
+	for name, (attendance_date, modified, types, overtime_entry) in contributions:
+		fingerprint.update(f"{name}|{modified}".encode())
+
+		for key in types:
+			violations[key]['count'] += 1
+			occurrence_dates[key].append(attendance_date)
+			if len(violations[key]['dates']) < dates_limit:
+				violations[key]['dates'].append(getdate(attendance_date))
+
+		if overtime_entry:
+			overtime_days.append(overtime_entry)
+
+	# Calculate amounts exactly in minor units, each occurrence at the rate of its day
+	for key, (_component_name, rate_field) in VIOLATION_TYPES.items():
+		violations[key]['amount_minor'] = price_dated_occurrences(
+			get_occurrence_rates(policy, rate_field, occurrence_dates[key]),
+			policy.deduction_tiers.get(key)
 		)
+		violations[key]['amount'] = from_minor(violations[key]['amount_minor'])
+		violations[key]['dates_truncated'] = violations[key]['count'] > len(violations[key]['dates'])
 
-		if overtime_data['total_amount'] > 0:
-			# Check if overtime component already exists
-			existing_overtime = None
-			for earning in doc.earnings:
-				if earning.salary_component == 'Designation Overtime Pay':
-					existing_overtime = earning
-					break
-
-			if existing_overtime:
-				existing_overtime.amount = overtime_data['total_amount']
-			else:
-				doc.append('earnings', {
-					'salary_component': 'Designation Overtime Pay',
-					'amount': overtime_data['total_amount']
-				})
-
-	# Recalculate totals
-	doc.gross_pay = sum([e.amount for e in doc.earnings])
-	doc.total_deduction = sum([d.amount for d in doc.deductions])
-	doc.net_pay = doc.gross_pay - doc.total_deduction
+	# Trailing-window rule across payroll periods, answered from the rolling counters
+	rolling_penalty = get_rolling_penalty(policy, end_date)
+	if rolling_penalty:
+		rolling_penalty['penalty_minor'] = to_minor(rolling_penalty['penalty'])
 
-	# Log what was calculated (for debugging)
-	frappe.logger().info(f"Calculated deductions for {doc.employee}: {deductions_map}")
+	total_deductions_minor = sum([v['amount_minor'] for v in violations.values()])
+	total_deductions_minor += rolling_penalty['penalty_minor'] if rolling_penalty else 0
 
+	return {
+		'policy': policy,
+		'violations': violations,
+		'total_deductions': from_minor(total_deductions_minor),
+		'total_deductions_minor': total_deductions_minor,
+		'rolling_penalty': rolling_penalty,
+		'overtime': summarize_overtime(policy, overtime_days, get_cap_carry_in(policy, start_date)),
+		'fingerprint': fingerprint.hexdigest(),
+		'state': state
+	}
+
+
+def _iter_period_attendance(employee, start_date, end_date):
+	return iter_attendance(
+		[employee],
+		start_date,
+		end_date,
+		fields=['status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit', 'modified']
+	)
+
+
+def _pack_row(contribution):
+	"""Compact stored form of a row contribution: violation types as a bitmask, overtime as a list"""
+	attendance_date, modified, types, overtime_entry = contribution
+	type_mask = sum(1 << index for index, key in enumerate(VIOLATION_TYPES) if key in types)
 
-def get_attendance_summary(employee, start_date, end_date):
+	return [attendance_date, modified, type_mask, pack_overtime_day(overtime_entry) if overtime_entry else None]
+
+
+def _unpack_row(name, packed):
+	"""Expand a row stored by _pack_row back into the form of get_row_contribution"""
+	attendance_date, modified, type_mask, overtime = packed
+
+	return [
+		attendance_date,
+		modified,
+		[key for index, key in enumerate(VIOLATION_TYPES) if type_mask >> index & 1],
+		unpack_overtime_day(overtime, attendance_date, name) if overtime else None
+	]
+
+
+def get_row_contribution(policy, att, leave_dates, shift_windows=None, shift_schedule=None):
 	"""
-	Get a summary of attendance violations for an employee in a period.
-	Useful for displaying in salary slip or reports.
+	What one attendance row contributes to the period.
 
 	Returns:
-		dict: Summary of violations and amounts
+		list: [attendance date, modified, violation types, overtime day entry or None]
 	"""
-	employee_doc = frappe.get_doc('Employee', employee)
+	types = classify_attendance(policy, att, leave_dates, shift_windows, shift_schedule)
+
+	overtime_entry = None
+	if has_overtime_policy(policy) and att.status in ['Present', 'Half Day']:
+		overtime_entry = price_overtime_day(policy, att, shift_schedule)
+
+	return [str(getdate(att.attendance_date)), str(att.modified), types, overtime_entry]
+
+
+def classify_attendance(policy, att, leave_dates, shift_windows=None, shift_schedule=None):
+	"""
+	Get the violation types an attendance row counts towards under the employee's policy.
+
+	Late / early flags are derived from the day's shift first when the policy asks for it, and
+	absences on approved leave or holidays are excused. This is the one place the slips,
+	dashboards and counters classify a row, so they always agree.
+
+	Args:
+		policy (frappe._dict): From resolve_policy
+		att (frappe._dict): Attendance row
+		leave_dates (set): The employee's approved leave dates
+		shift_windows (dict, optional): From get_shift_windows, loaded when not given
+		shift_schedule (frappe._dict, optional): From load_shift_schedule, for the day's assigned shift
+	"""
+	if policy.derive_attendance_flags:
+		derive_flags(
+			att,
+			shift_windows if shift_windows is not None else get_shift_windows(),
+			policy.default_shift,
+			get_scheduled_shift(shift_schedule, policy.employee, att.attendance_date)
+		)
+
+	return get_violation_types(att, att.status == 'Absent' and is_excused_absence(policy, att, leave_dates))
+
 
-	if not employee_doc.designation:
-		return {'error': 'Employee has no designation'}
+def _get_computation_basis(policy, start_date, end_date, leave_dates, shift_windows, shift_schedule=None):
+	"""Everything besides attendance a row's contribution depends on, as a hash"""
+	holiday_bitmaps = [
+		get_year_bitmaps(policy.holiday_list, year)
+		for year in range(getdate(start_date).year, getdate(end_date).year + 1)
+	] if policy.holiday_list else None
 
-	designation = frappe.get_doc('Designation', employee_doc.designation)
+	return hashlib.sha1(frappe.as_json({
+		**{field: policy.get(field) for field in POLICY_FIELDS},
+		'overtime_tiers': policy.overtime_tiers,
+		'rate_versions': policy.rate_versions,
+		'leave_dates': sorted(str(d) for d in leave_dates),
+		'shift_windows': shift_windows,
+		'shift_schedule': shift_schedule,
+		'holidays': holiday_bitmaps,
+		'precision': get_money_precision()
+	}).encode()).hexdigest()
 
-	# Get attendance records
-	attendance_records = frappe.get_all(
+
+def _apply_attendance_changes(policy, employee, start_date, end_date, leave_dates, shift_windows, shift_schedule, previous_state):
+	"""
+	Update the previous per-row contributions with attendance modified since they were computed.
+
+	Submitted rows are (re)applied and cancelled rows removed. Rows changed shortly
+	before the previous computation are read again, since their transactions may not have
+	been visible to it yet. Returns None when rows were deleted without being seen, so the
+	caller rescans the period.
+	"""
+	rows = dict(previous_state['rows'])
+	since = add_to_date(get_datetime(previous_state['computed_at']), seconds=-DELTA_OVERLAP_SECONDS)
+
+	for att in frappe.get_all(
 		'Attendance',
 		filters={
 			'employee': employee,
 			'attendance_date': ['between', [start_date, end_date]],
-			'docstatus': 1
+			'modified': ['>=', since]
 		},
-		fields=['name', 'attendance_date', 'status', 'in_time', 'out_time', 'late_entry', 'early_exit']
-	)
+		fields=['name', 'docstatus', 'attendance_date', 'status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit', 'modified']
+	):
+		if att.docstatus == 1:
+			rows[att.name] = _pack_row(get_row_contribution(policy, att, leave_dates, shift_windows, shift_schedule))
+		else:
+			rows.pop(att.name, None)
+
+	submitted = frappe.db.count('Attendance', {
+		'employee': employee,
+		'attendance_date': ['between', [start_date, end_date]],
+		'docstatus': 1
+	})
 
-	# Count violations
-	violations = {
-		'absent': {'count': 0, 'rate': designation.absent_deduction or 0, 'dates': []},
-		'late': {'count': 0, 'rate': designation.late_deduction or 0, 'dates': []},
-		'early_exit': {'count': 0, 'rate': designation.early_exit_deduction or 0, 'dates': []},
-		'no_checkout': {'count': 0, 'rate': designation.no_checkout_deduction or 0, 'dates': []}
-	}
+	return rows if submitted == len(rows) else None
 
-	for att in attendance_records:
-		if att.status == 'Absent':
-			violations['absent']['count'] += 1
-			violations['absent']['dates'].append(att.attendance_date)
 
-		if att.late_entry == 1:
-			violations['late']['count'] += 1
-			violations['late']['dates'].append(att.attendance_date)
+def get_violation_types(att, excused=False):
+	"""
+	Get the violation types (keys of VIOLATION_TYPES) an attendance row counts towards.
+
+	`excused` marks an Absent row on approved leave or a holiday, which is not deducted.
+	"""
+	types = []
 
-		if att.early_exit == 1:
-			violations['early_exit']['count'] += 1
-			violations['early_exit']['dates'].append(att.attendance_date)
+	# Absences
+	if att.status == 'Absent' and not excused:
+		types.append('absent')
 
-		if att.status in ['Present', 'Half Day'] and not att.out_time:
-			violations['no_checkout']['count'] += 1
-			violations['no_checkout']['dates'].append(att.attendance_date)
+	# Late entries
+	if att.late_entry == 1:
+		types.append('late')
 
-	# Calculate amounts
-	for key in violations:
-		violations[key]['amount'] = violations[key]['count'] * violations[key]['rate']
+	# Early exits
+	if att.early_exit == 1:
+		types.append('early_exit')
 
-	total_deductions = sum([v['amount'] for v in violations.values()])
+	# No checkout (present but no out_time)
+	if att.status in ['Present', 'Half Day'] and not att.out_time:
+		types.append('no_checkout')
+
+	return types
+
+
+@use_read_replica
+def get_attendance_summary(employee, start_date, end_date, dates_limit=None):
+	"""
+	Get a summary of attendance violations for an employee in a period.
+	Useful for displaying in salary slip or reports.
+
+	Returns:
+		dict: Summary of violations and amounts
+	"""
+	employee_name = frappe.db.get_value('Employee', employee, 'employee_name')
+	computation = compute_attendance_adjustments(employee, start_date, end_date, dates_limit=dates_limit)
 
 	return {
 		'employee': employee,
-		'employee_name': employee_doc.employee_name,
-		'designation': employee_doc.designation,
+		'employee_name': employee_name,
+		'designation': computation['policy'].designation,
 		'period': f"{start_date} to {end_date}",
-		'violations': violations,
-		'total_deductions': total_deductions
+		'violations': computation['violations'],
+		'rolling_penalty': computation['rolling_penalty'],
+		'total_deductions': computation['total_deductions']
 	}
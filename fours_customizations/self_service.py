@@ -0,0 +1,212 @@
+"""
+Employee self-service figures for Fours Customizations
+Month-to-date deductions and overtime served from an incrementally maintained per-employee accumulator
+"""
+
+import functools
+
+import frappe
+from frappe import _
+from frappe.utils import get_first_day, get_last_day, getdate, today
+
+from fours_customizations.attendance_query import attendance_row_from_doc, iter_attendance
+from fours_customizations.deduction_tiers import price_dated_occurrences
+from fours_customizations.leave_calendar import get_leave_dates
+from fours_customizations.money import from_minor
+from fours_customizations.overtime_utils import summarize_overtime
+from fours_customizations.policy import resolve_policy
+from fours_customizations.rate_versions import get_occurrence_rates, get_rates_on
+from fours_customizations.salary_slip_handler import VIOLATION_TYPES, get_row_contribution
+from fours_customizations.shift_schedule import load_shift_schedule, needs_shift_schedule
+
+# Versioned: rows keep their date and the whole overtime entry since the monthly cap and rate versions
+CACHE_PREFIX = 'fours_mtd_v3'
+USER_EMPLOYEE_KEY = 'fours_user_employee'
+
+
+@frappe.whitelist()
+def get_my_month_to_date(employee=None):
+	"""
+	Get month-to-date attendance deductions and overtime for the logged-in employee.
+
+	Send the returned `etag` back as the If-None-Match header; while nothing has changed
+	the response is an empty 304 served from Redis without touching the database.
+
+	Args:
+		employee (str): Optional Employee ID; requires read permission when it is not the user's own
+
+	Returns:
+		dict: Violations, total deductions, overtime hours and amount, and the etag
+	"""
+	own_employee = _get_user_employee(frappe.session.user)
+	employee = employee or own_employee
+
+	if not employee:
+		frappe.throw(_("No Employee record is linked to your user"), frappe.PermissionError)
+
+	if employee != own_employee:
+		frappe.has_permission('Employee', 'read', doc=employee, throw=True)
+
+	month_start = get_first_day(today())
+	accumulator = get_accumulator(employee, month_start)
+	etag = f'"{employee}-{month_start:%Y%m}-{accumulator["revision"]}"'
+
+	_set_response_header('ETag', etag)
+	_set_response_header('Cache-Control', 'private, no-cache')
+
+	if frappe.get_request_header('If-None-Match') == etag:
+		frappe.local.response['http_status_code'] = 304
+		return None
+
+	return _summarize(employee, month_start, accumulator, etag)
+
+
+def get_accumulator(employee, month_start):
+	"""
+	Get an employee's accumulator for a month, building it on first use.
+
+	Returns:
+		dict: {'revision': str, 'rows': {attendance name: [attendance date, violation types, overtime day entry or None]}}
+	"""
+	month = f"{getdate(month_start):%Y-%m}"
+	accumulator = frappe.cache().hget(_cache_key(employee), month)
+
+	if accumulator is None:
+		accumulator = _build_accumulator(employee, getdate(month_start))
+		frappe.cache().hset(_cache_key(employee), month, accumulator)
+
+	return accumulator
+
+
+def _build_accumulator(employee, month_start):
+	"""Read one month of attendance and record each row's contribution"""
+	policy = resolve_policy(employee)
+	month_end = get_last_day(month_start)
+	leave_dates = get_leave_dates([employee], month_start, month_end).get(employee, set())
+	shift_schedule = load_shift_schedule([employee], month_start, month_end) if needs_shift_schedule(policy) else None
+	rows = {}
+
+	for att in iter_attendance(
+		[employee],
+		month_start,
+		month_end,
+		fields=['status', 'shift', 'in_time', 'out_time', 'late_entry', 'early_exit']
+	):
+		rows[att.name] = _get_contribution(policy, att, leave_dates, shift_schedule)
+
+	return {'revision': frappe.generate_hash(length=10), 'rows': rows}
+
+
+def _get_contribution(policy, att, leave_dates, shift_schedule=None):
+	"""What one attendance row adds to the month: its date, violation types and the overtime day entry"""
+	attendance_date, _modified, types, entry = get_row_contribution(policy, att, leave_dates, shift_schedule=shift_schedule)
+
+	return [attendance_date, types, entry]
+
+
+def update_accumulator(doc, method=None):
+	"""
+	Attendance on_submit / on_cancel: apply the row to its month's accumulator.
+
+	Applied once the transaction commits, so a submit or cancel that rolls back never
+	reaches the accumulator. Months that are not cached yet are skipped; they are built
+	when first read.
+	"""
+	frappe.db.after_commit.add(functools.partial(_apply_to_accumulator, doc))
+
+
+def _apply_to_accumulator(doc):
+	month = f"{getdate(doc.attendance_date):%Y-%m}"
+	accumulator = frappe.cache().hget(_cache_key(doc.employee), month)
+
+	if accumulator is None:
+		return
+
+	if doc.docstatus == 1:
+		policy = resolve_policy(doc.employee)
+		leave_dates = get_leave_dates([doc.employee], doc.attendance_date, doc.attendance_date).get(doc.employee, set()) if doc.status == 'Absent' else set()
+		shift_schedule = load_shift_schedule([doc.employee], doc.attendance_date, doc.attendance_date) if needs_shift_schedule(policy) else None
+		accumulator['rows'][doc.name] = _get_contribution(policy, attendance_row_from_doc(doc), leave_dates, shift_schedule)
+	else:
+		accumulator['rows'].pop(doc.name, None)
+
+	accumulator['revision'] = frappe.generate_hash(length=10)
+	frappe.cache().hset(_cache_key(doc.employee), month, accumulator)
+
+
+def _summarize(employee, month_start, accumulator, etag):
+	"""Turn accumulator rows into the month-to-date figures"""
+	policy = resolve_policy(employee)
+
+	occurrence_dates = {key: [] for key in VIOLATION_TYPES}
+	overtime_days = []
+
+	# Date order, for the tiers, the rate versions and the monthly cap's running total
+	for _name, (attendance_date, violation_types, overtime_entry) in sorted(accumulator['rows'].items(), key=lambda row: (row[1][0], row[0])):
+		for key in violation_types:
+			occurrence_dates[key].append(attendance_date)
+		if overtime_entry:
+			overtime_days.append(overtime_entry)
+
+	overtime = summarize_overtime(policy, overtime_days)
+
+	deductions_minor = {
+		key: price_dated_occurrences(get_occurrence_rates(policy, rate_field, occurrence_dates[key]), policy.deduction_tiers.get(key))
+		for key, (component_name, rate_field) in VIOLATION_TYPES.items()
+	}
+
+	rates = get_rates_on(policy, today())
+	violations = {
+		key: {
+			'count': len(occurrence_dates[key]),
+			'rate': rates[rate_field],
+			'amount': from_minor(deductions_minor[key])
+		}
+		for key, (component_name, rate_field) in VIOLATION_TYPES.items()
+	}
+
+	return {
+		'employee': employee,
+		'period': {'start_date': month_start, 'end_date': today()},
+		'violations': violations,
+		'total_deductions': from_minor(sum(deductions_minor.values())),
+		'overtime': {
+			'hours': overtime['total_hours'],
+			'amount': overtime['total_amount'],
+			'unpaid_hours': overtime['unpaid_hours']
+		},
+		'etag': etag
+	}
+
+
+def _get_user_employee(user):
+	"""Employee linked to a user, cached so unchanged refreshes stay off the database"""
+	employee = frappe.cache().hget(USER_EMPLOYEE_KEY, user)
+
+	if employee is None:
+		employee = frappe.db.get_value('Employee', {'user_id': user, 'status': 'Active'}, 'name') or ''
+		frappe.cache().hset(USER_EMPLOYEE_KEY, user, employee)
+
+	return employee
+
+
+def _set_response_header(header, value):
+	"""Set an HTTP response header when running inside a request"""
+	headers = getattr(frappe.local, 'response_headers', None)
+	if headers is not None:
+		headers[header] = value
+
+
+def _cache_key(employee):
+	return f"{CACHE_PREFIX}|{employee}"
+
+
+def invalidate_employee_accumulators(doc, method=None):
+	"""Employee changed: drop their accumulators and the user -> employee mapping"""
+	frappe.cache().delete_value(_cache_key(doc.name))
+	frappe.cache().delete_key(USER_EMPLOYEE_KEY)
+
+
+def invalidate_all_accumulators(doc=None, method=None):
+	"""Designation, Department or Company changed: rates may differ, so rebuild on next read"""
+	frappe.cache().delete_keys(CACHE_PREFIX)
@@ -0,0 +1,127 @@
+"""
+Shift Assignment lookups for Fours Customizations
+A period's assignments are loaded with one query; each attendance day's shift is an interval bisect
+"""
+
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+import frappe
+from frappe.utils import add_days, date_diff, getdate, today
+
+from fours_customizations.attendance_flags import get_shift_windows
+
+# Stands in for the end of an open-ended assignment
+OPEN_END = '9999-12-31'
+
+
+def load_shift_schedule(employees, start_date, end_date):
+	"""
+	Load the employees' Shift Assignments overlapping a period, with one query.
+
+	Returns:
+		frappe._dict: {
+			'windows': from get_shift_windows,
+			'assignments': Employee ID -> {'starts', 'ends', 'shifts'}, parallel lists sorted by start date
+		}
+	"""
+	assignments = {}
+
+	if employees:
+		ShiftAssignment = frappe.qb.DocType('Shift Assignment')
+		rows = (
+			frappe.qb.from_(ShiftAssignment)
+			.select(ShiftAssignment.employee, ShiftAssignment.shift_type, ShiftAssignment.start_date, ShiftAssignment.end_date)
+			.where(ShiftAssignment.employee.isin(employees))
+			.where(ShiftAssignment.docstatus == 1)
+			.where(ShiftAssignment.status == 'Active')
+			.where(ShiftAssignment.start_date <= end_date)
+			.where(ShiftAssignment.end_date.isnull() | (ShiftAssignment.end_date >= start_date))
+			.orderby(ShiftAssignment.employee)
+			.orderby(ShiftAssignment.start_date)
+		).run(as_dict=True)
+
+		for row in rows:
+			intervals = assignments.setdefault(row.employee, {'starts': [], 'ends': [], 'shifts': []})
+			intervals['starts'].append(str(getdate(row.start_date)))
+			intervals['ends'].append(str(getdate(row.end_date)) if row.end_date else OPEN_END)
+			intervals['shifts'].append(row.shift_type)
+
+	return frappe._dict(windows=get_shift_windows(), assignments=assignments)
+
+
+def get_assigned_shift(intervals, attendance_date):
+	"""
+	Get the Shift Type assigned on a day by bisecting an employee's assignment intervals.
+
+	Where assignments overlap, the one that started last wins.
+
+	Returns:
+		str: Shift Type, or None when no assignment covers the day
+	"""
+	if not intervals:
+		return None
+
+	attendance_date = str(getdate(attendance_date))
+	index = bisect_right(intervals['starts'], attendance_date) - 1
+
+	while index >= 0:
+		if intervals['ends'][index] >= attendance_date:
+			return intervals['shifts'][index]
+		index -= 1
+
+	return None
+
+
+def get_scheduled_shift(shift_schedule, employee, attendance_date):
+	"""Get the Shift Type assigned to an employee on a day, or None without a shift_schedule"""
+	if not shift_schedule:
+		return None
+
+	return get_assigned_shift(shift_schedule.assignments.get(employee), attendance_date)
+
+
+def needs_shift_schedule(policy):
+	"""Check whether a policy reads the day's assigned shift: for derived flags or overtime from shift end"""
+	return bool(policy.derive_attendance_flags or policy.overtime_from_shift_end)
+
+
+def get_shift_end(shift_schedule, employee, att, default_shift=None):
+	"""
+	Get when an attendance day's shift ends.
+
+	The shift is the one assigned that day, else the one recorded on the attendance,
+	else the employee's default shift. Night shifts end on the next day.
+
+	Returns:
+		tuple: (Shift Type, end datetime), or (None, None) when the day has no known shift
+	"""
+	shift = get_scheduled_shift(shift_schedule, employee, att.attendance_date) or att.get('shift') or default_shift
+	window = shift_schedule.windows.get(shift)
+	if not window:
+		return None, None
+
+	start_seconds, end_seconds = window[0], window[1]
+	if end_seconds <= start_seconds:
+		end_seconds += 24 * 3600
+
+	return shift, datetime.combine(getdate(att.attendance_date), time()) + timedelta(seconds=end_seconds)
+
+
+def on_shift_assignment_change(doc, method=None):
+	"""Shift Assignment on_submit / on_cancel / on_update_after_submit: recompute the days it covers"""
+	# Imported here to avoid a circular import with the handler
+	from fours_customizations.attendance_sync import mark_dirty
+	from fours_customizations.rolling_counters import invalidate_employee_counters
+	from fours_customizations.self_service import invalidate_employee_accumulators
+
+	# Attendance exists up to today at most
+	last_date = min(getdate(doc.end_date or today()), getdate(today()))
+
+	mark_dirty([
+		(doc.employee, add_days(doc.start_date, offset))
+		for offset in range(date_diff(last_date, doc.start_date) + 1)
+	])
+
+	invalidate_employee_accumulators(frappe._dict(name=doc.employee))
+	invalidate_employee_counters(frappe._dict(name=doc.employee))
@@ -0,0 +1,106 @@
+"""
+Concurrency-safe salary slip updates for Fours Customizations
+Per-slip advisory locks and idempotent component upserts
+"""
+
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate
+
+DEFAULT_LOCK_TIMEOUT = 30
+
+
+def acquire_slip_lock(employee, start_date):
+	"""
+	Take the advisory lock for an employee's payroll period until the transaction ends.
+
+	The lock is keyed by employee and period start rather than slip name, so it also
+	covers slips that are being inserted and have no name yet. Re-acquiring within the
+	same transaction is a no-op. Waits up to `fours_slip_lock_timeout` seconds.
+	"""
+	key = 'fours_slip_' + hashlib.md5(f"{employee}|{getdate(start_date)}".encode()).hexdigest()
+
+	if not hasattr(frappe.local, 'fours_slip_locks'):
+		frappe.local.fours_slip_locks = {}
+
+	held = frappe.local.fours_slip_locks
+	if key in held:
+		return
+
+	timeout = cint(frappe.conf.get('fours_slip_lock_timeout')) or DEFAULT_LOCK_TIMEOUT
+
+	if frappe.db.db_type == 'postgres':
+		# Transaction-scoped; released by commit or rollback on its own
+		frappe.db.sql(f"SET LOCAL lock_timeout = '{timeout}s'")
+		frappe.db.sql("SELECT pg_advisory_xact_lock(hashtext(%s))", key)
+		acquired = True
+	else:
+		acquired = frappe.db.sql("SELECT GET_LOCK(%s, %s)", (key, timeout))[0][0] == 1
+
+	if not acquired:
+		frappe.throw(
+			_("Salary Slip for {0} is being calculated by another process. Please try again.").format(employee),
+			title=_("Salary Slip Locked")
+		)
+
+	token = frappe.generate_hash(length=8)
+	held[key] = token
+
+	def release():
+		# Only release the acquisition this callback belongs to
+		if held.get(key) != token:
+			return
+		del held[key]
+		if frappe.db.db_type != 'postgres':
+			frappe.db.sql("SELECT RELEASE_LOCK(%s)", key)
+
+	frappe.db.after_commit.add(release)
+	frappe.db.after_rollback.add(release)
+
+
+def upsert_component(doc, table, component_name, amount):
+	"""
+	Set an app-managed component on a slip exactly once.
+
+	Updates the first row for the component and removes any duplicates left by earlier
+	concurrent saves. A component that no longer applies is set to zero rather than
+	removed, since it may also come from the salary structure.
+
+	Args:
+		doc: Salary Slip document
+		table (str): 'earnings' or 'deductions'
+		component_name (str): Salary Component name
+		amount (float): Amount to set
+
+	Returns:
+		bool: True when the slip was changed
+	"""
+	rows = [row for row in doc.get(table) if row.salary_component == component_name]
+
+	if not rows:
+		if amount <= 0:
+			return False
+
+		doc.append(table, {
+			'salary_component': component_name,
+			'amount': amount,
+			'default_amount': amount,
+			'depends_on_payment_days': 0
+		})
+		return True
+
+	changed = False
+	for duplicate in rows[1:]:
+		doc.remove(duplicate)
+		changed = True
+
+	row = rows[0]
+	if row.amount != amount or row.default_amount != amount or row.depends_on_payment_days:
+		# Fixed amount: HRMS must not prorate it by payment days when totalling
+		row.amount = row.default_amount = amount
+		row.depends_on_payment_days = 0
+		changed = True
+
+	return changed
@@ -0,0 +1,143 @@
+"""
+Salary Slip computation snapshots for Fours Customizations
+The handler stores what it computed on the slip; print formats, emails and readers use that instead of recomputing
+"""
+
+import json
+
+import frappe
+from frappe.utils import getdate, now_datetime
+
+SNAPSHOT_FIELD = 'attendance_snapshot'
+
+# Bump when the snapshot layout changes; older snapshots are then ignored by readers
+# 2: rolling_penalty
+# 3: state rows in the compact encoding of the handler's _pack_row
+# 4: monthly overtime cap fields
+SNAPSHOT_VERSION = 4
+
+OVERTIME_COLUMNS = [
+	'date', 'attendance', 'hours', 'amount', 'rate_multiplier', 'day_type', 'capped',
+	'monthly_capped', 'unpaid_hours'
+]
+
+
+def build_snapshot(computation):
+	"""
+	Build the compact snapshot for a computation from compute_attendance_adjustments.
+
+	Returns:
+		dict: Versioned snapshot with counts, rates, amounts and per-day overtime rows
+	"""
+	overtime = computation['overtime']
+
+	return {
+		'version': SNAPSHOT_VERSION,
+		'computed_at': str(now_datetime()),
+		'fingerprint': computation['fingerprint'],
+		'designation': computation['policy'].designation,
+		'violations': {
+			key: {
+				'count': data['count'],
+				'rate': data['rate'],
+				'amount': data['amount'],
+				'dates': [str(d) for d in data['dates']],
+				'dates_truncated': data['dates_truncated']
+			}
+			for key, data in computation['violations'].items()
+		},
+		'total_deductions': computation['total_deductions'],
+		'rolling_penalty': computation['rolling_penalty'],
+		'state': computation['state'],
+		'overtime': {
+			'total_hours': overtime['total_hours'],
+			'total_amount': overtime['total_amount'],
+			'hourly_rate': overtime['hourly_rate'],
+			'unpaid_hours': overtime['unpaid_hours'],
+			'capped_days': [str(d) for d in overtime['capped_days']],
+			'columns': OVERTIME_COLUMNS,
+			'rows': [
+				[
+					str(day['date']),
+					day['attendance'],
+					day['overtime_hours'],
+					day['overtime_amount'],
+					day['rate_multiplier'],
+					day['day_type'],
+					int(day['capped']),
+					int(day['monthly_capped']),
+					day['unpaid_hours']
+				]
+				for day in overtime['daily_breakdown']
+			]
+		}
+	}
+
+
+def set_slip_snapshot(doc, computation):
+	"""Store the snapshot for a computation on a Salary Slip document"""
+	if not doc.meta.has_field(SNAPSHOT_FIELD):
+		return
+
+	doc.set(SNAPSHOT_FIELD, json.dumps(build_snapshot(computation), separators=(',', ':'), default=str))
+
+
+def get_snapshot_state(doc):
+	"""Get the per-row state of the slip's last computation, for delta recomputation"""
+	raw = doc.get(SNAPSHOT_FIELD)
+	if not raw:
+		return None
+
+	snapshot = json.loads(raw) if isinstance(raw, str) else raw
+	if snapshot.get('version') != SNAPSHOT_VERSION:
+		return None
+
+	return snapshot.get('state')
+
+
+def get_attendance_snapshot(doc):
+	"""
+	Read the snapshot stored on a Salary Slip document.
+
+	Overtime rows are expanded back into dicts and the handler's internal per-row state
+	is left out. Available to print formats (and the email-slip flow, which renders them).
+
+	Returns:
+		dict: Snapshot, or None when the slip has no current-version snapshot
+	"""
+	raw = doc.get(SNAPSHOT_FIELD)
+	if not raw:
+		return None
+
+	snapshot = json.loads(raw) if isinstance(raw, str) else raw
+	if snapshot.get('version') != SNAPSHOT_VERSION:
+		return None
+
+	snapshot.pop('state', None)
+
+	overtime = snapshot['overtime']
+	overtime['daily_breakdown'] = [dict(zip(overtime['columns'], row, strict=True)) for row in overtime.pop('rows')]
+	for day in overtime['daily_breakdown']:
+		day['date'] = getdate(day['date'])
+		day['capped'] = bool(day['capped'])
+		day['monthly_capped'] = bool(day['monthly_capped'])
+	overtime['capped_days'] = [getdate(d) for d in overtime['capped_days']]
+
+	return snapshot
+
+
+@frappe.whitelist()
+def get_slip_snapshot(salary_slip):
+	"""
+	Get the stored attendance deductions and overtime breakdown of a Salary Slip.
+
+	Args:
+		salary_slip (str): Salary Slip name
+
+	Returns:
+		dict: Snapshot, or None when the slip has not been computed by this version
+	"""
+	doc = frappe.get_doc('Salary Slip', salary_slip)
+	doc.check_permission('read')
+
+	return get_attendance_snapshot(doc)
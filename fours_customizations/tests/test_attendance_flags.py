@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime
+
+import frappe
+
+from fours_customizations.attendance_flags import derive_flags
+
+HOUR = 3600
+
+# Shift Type -> (start seconds, end seconds, late grace seconds, early exit grace seconds)
+SHIFT_WINDOWS = {
+	'Day': (8 * HOUR, 17 * HOUR, 15 * 60, 10 * 60),
+	'Night': (22 * HOUR, 6 * HOUR, 0, 0)
+}
+
+
+def _attendance(in_time, out_time, shift='Day', status='Present', late_entry=0, early_exit=0):
+	return frappe._dict(
+		attendance_date='2025-01-02',
+		status=status,
+		shift=shift,
+		in_time=in_time,
+		out_time=out_time,
+		late_entry=late_entry,
+		early_exit=early_exit
+	)
+
+
+class TestDeriveFlags(unittest.TestCase):
+	def test_within_grace(self):
+		att = derive_flags(_attendance('2025-01-02 08:15:00', '2025-01-02 16:50:00'), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (0, 0))
+
+	def test_past_grace(self):
+		att = derive_flags(_attendance('2025-01-02 08:16:00', '2025-01-02 16:49:00'), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (1, 1))
+
+	def test_flags_already_set_are_kept(self):
+		att = derive_flags(_attendance('2025-01-02 08:00:00', '2025-01-02 17:00:00', late_entry=1), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (1, 0))
+
+	def test_night_shift_ends_the_next_day(self):
+		att = derive_flags(_attendance(datetime(2025, 1, 2, 22, 0), datetime(2025, 1, 3, 5, 0), 'Night'), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (0, 1))
+
+	def test_no_checkout_is_not_an_early_exit(self):
+		att = derive_flags(_attendance('2025-01-02 09:00:00', None), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (1, 0))
+
+	def test_default_shift_when_the_row_has_none(self):
+		att = derive_flags(_attendance('2025-01-02 09:00:00', '2025-01-02 17:00:00', shift=None), SHIFT_WINDOWS, 'Day')
+
+		self.assertEqual(att.late_entry, 1)
+
+	def test_assigned_shift_comes_first(self):
+		att = derive_flags(
+			_attendance(datetime(2025, 1, 2, 22, 30), datetime(2025, 1, 3, 6, 0)),
+			SHIFT_WINDOWS,
+			'Day',
+			assigned_shift='Night'
+		)
+
+		self.assertEqual((att.late_entry, att.early_exit), (1, 0))
+
+	def test_rows_without_a_known_shift_are_unchanged(self):
+		att = derive_flags(_attendance('2025-01-02 09:00:00', '2025-01-02 12:00:00', shift='Unknown'), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (0, 0))
+
+	def test_absent_rows_are_unchanged(self):
+		att = derive_flags(_attendance(None, None, status='Absent'), SHIFT_WINDOWS)
+
+		self.assertEqual((att.late_entry, att.early_exit), (0, 0))
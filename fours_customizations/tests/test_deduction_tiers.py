@@ -0,0 +1,76 @@
+import unittest
+
+from fours_customizations.deduction_tiers import (
+	compile_deduction_tiers,
+	price_dated_occurrences,
+	price_occurrences,
+)
+
+# First 2 lates free, 3-5 at the base rate, then double
+LATE_TIERS = [
+	{'violation_type': 'Late', 'from_occurrence': 6, 'to_occurrence': 0, 'rate_multiplier': 2},
+	{'violation_type': 'Late', 'from_occurrence': 1, 'to_occurrence': 2, 'rate_multiplier': 0},
+	{'violation_type': 'Late', 'from_occurrence': 3, 'to_occurrence': 5, 'rate_multiplier': 1}
+]
+
+
+class TestDeductionTiers(unittest.TestCase):
+	def test_compile_groups_and_sorts_by_violation_key(self):
+		compiled = compile_deduction_tiers([
+			*LATE_TIERS,
+			{'violation_type': 'Absent', 'from_occurrence': 0, 'to_occurrence': 1, 'rate_multiplier': 3},
+			{'violation_type': 'Unknown', 'from_occurrence': 1, 'to_occurrence': 1, 'rate_multiplier': 3}
+		])
+
+		self.assertEqual(set(compiled), {'late', 'absent'})
+		self.assertEqual(compiled['late'], [(1, 2, 0), (3, 5, 1000), (6, None, 2000)])
+		# Occurrences start at 1
+		self.assertEqual(compiled['absent'], [(1, 1, 3000)])
+
+	def test_price_without_tiers(self):
+		self.assertEqual(price_occurrences(4, 250), 1000)
+		self.assertEqual(price_occurrences(0, 250), 0)
+
+	def test_price_graduated(self):
+		tiers = compile_deduction_tiers(LATE_TIERS)['late']
+
+		self.assertEqual(price_occurrences(2, 100, tiers), 0)
+		self.assertEqual(price_occurrences(5, 100, tiers), 300)
+		self.assertEqual(price_occurrences(7, 100, tiers), 300 + 400)
+
+	def test_occurrences_outside_every_tier_pay_the_base_rate(self):
+		tiers = compile_deduction_tiers([
+			{'violation_type': 'Absent', 'from_occurrence': 2, 'to_occurrence': 3, 'rate_multiplier': 1.5}
+		])['absent']
+
+		self.assertEqual(price_occurrences(5, 100, tiers), 100 + 300 + 200)
+
+	def test_earlier_tier_wins_where_tiers_overlap(self):
+		tiers = compile_deduction_tiers([
+			{'violation_type': 'Absent', 'from_occurrence': 1, 'to_occurrence': 3, 'rate_multiplier': 2},
+			{'violation_type': 'Absent', 'from_occurrence': 2, 'to_occurrence': 4, 'rate_multiplier': 5}
+		])['absent']
+
+		self.assertEqual(price_occurrences(4, 100, tiers), 600 + 500)
+		self.assertEqual(price_dated_occurrences([100, 100, 100, 200], tiers), 600 + 1000)
+
+	def test_dated_occurrences_with_one_rate_match_price_occurrences(self):
+		tiers = compile_deduction_tiers(LATE_TIERS)['late']
+
+		self.assertEqual(price_dated_occurrences([100] * 7, tiers), price_occurrences(7, 100, tiers))
+		self.assertEqual(price_dated_occurrences([]), 0)
+
+	def test_dated_occurrences_use_each_day_rate(self):
+		tiers = compile_deduction_tiers(LATE_TIERS)['late']
+
+		# Ranks 1-2 free, 3-5 base, 6 double; the rate changes from the 4th occurrence
+		self.assertEqual(price_dated_occurrences([100, 100, 100, 150, 150, 150], tiers), 100 + 150 + 150 + 300)
+		self.assertEqual(price_dated_occurrences([100, 200]), 300)
+
+	def test_rounding_of_fractional_multipliers(self):
+		tiers = compile_deduction_tiers([
+			{'violation_type': 'Late', 'from_occurrence': 1, 'to_occurrence': 0, 'rate_multiplier': 0.333}
+		])['late']
+
+		# 3 x 0.333 x 5 = 4.995, rounded half up once
+		self.assertEqual(price_occurrences(3, 5, tiers), 5)
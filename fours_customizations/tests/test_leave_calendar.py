@@ -0,0 +1,47 @@
+import unittest
+from datetime import date
+
+import frappe
+
+from fours_customizations.leave_calendar import _expand
+
+
+def _leave(from_date, to_date, half_day=0, half_day_date=None, employee='EMP-1'):
+	return frappe._dict(
+		employee=employee,
+		from_date=from_date,
+		to_date=to_date,
+		half_day=half_day,
+		half_day_date=half_day_date
+	)
+
+
+class TestExpandLeaves(unittest.TestCase):
+	def test_full_days_are_clipped_to_the_period(self):
+		dates = _expand([_leave('2025-01-30', '2025-02-02')], '2025-02-01', '2025-02-28')
+
+		self.assertEqual(dates, {'EMP-1': {date(2025, 2, 1), date(2025, 2, 2)}})
+
+	def test_half_day_is_not_covered(self):
+		dates = _expand([_leave('2025-01-06', '2025-01-08', 1, '2025-01-07')], '2025-01-01', '2025-01-31')
+
+		self.assertEqual(dates['EMP-1'], {date(2025, 1, 6), date(2025, 1, 8)})
+
+	def test_single_half_day_leave_covers_nothing(self):
+		dates = _expand([_leave('2025-01-06', '2025-01-06', 1, '2025-01-06')], '2025-01-01', '2025-01-31')
+
+		self.assertEqual(dates, {'EMP-1': set()})
+
+	def test_half_day_date_is_ignored_without_the_half_day_flag(self):
+		dates = _expand([_leave('2025-01-06', '2025-01-07', 0, '2025-01-07')], '2025-01-01', '2025-01-31')
+
+		self.assertEqual(dates['EMP-1'], {date(2025, 1, 6), date(2025, 1, 7)})
+
+	def test_leaves_are_grouped_per_employee(self):
+		dates = _expand(
+			[_leave('2025-01-06', '2025-01-06'), _leave('2025-01-09', '2025-01-09'), _leave('2025-01-07', '2025-01-07', employee='EMP-2')],
+			'2025-01-01',
+			'2025-01-31'
+		)
+
+		self.assertEqual(dates, {'EMP-1': {date(2025, 1, 6), date(2025, 1, 9)}, 'EMP-2': {date(2025, 1, 7)}})
@@ -0,0 +1,35 @@
+import unittest
+
+from fours_customizations.money import div_round, from_minor, to_minor, to_scaled_multiplier
+
+
+class TestMoney(unittest.TestCase):
+	def test_to_minor_rounds_half_up_once(self):
+		self.assertEqual(to_minor(12.345, 2), 1235)
+		self.assertEqual(to_minor(12.344, 2), 1234)
+		# 0.30000000000000004 as a float
+		self.assertEqual(to_minor(0.1 + 0.2, 2), 30)
+		self.assertEqual(to_minor(1500, 0), 1500)
+		self.assertEqual(to_minor(None, 2), 0)
+
+	def test_from_minor(self):
+		self.assertEqual(from_minor(1235, 2), 12.35)
+		self.assertEqual(from_minor(1500, 0), 1500.0)
+		self.assertEqual(from_minor(-5, 2), -0.05)
+
+	def test_to_scaled_multiplier(self):
+		self.assertEqual(to_scaled_multiplier(1.5), 1500)
+		self.assertEqual(to_scaled_multiplier('2'), 2000)
+		self.assertEqual(to_scaled_multiplier(0.0005), 1)
+		# Unset is the base rate, 0 is a real multiplier
+		self.assertEqual(to_scaled_multiplier(None), 1000)
+		self.assertEqual(to_scaled_multiplier(0), 0)
+
+	def test_div_round_half_away_from_zero(self):
+		self.assertEqual(div_round(5, 2), 3)
+		self.assertEqual(div_round(-5, 2), -3)
+		self.assertEqual(div_round(4, 3), 1)
+		self.assertEqual(div_round(-4, 3), -1)
+		self.assertEqual(div_round(0, 7), 0)
+		# Beyond float precision
+		self.assertEqual(div_round(10**30 + 1, 2), 5 * 10**29 + 1)
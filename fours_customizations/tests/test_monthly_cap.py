@@ -0,0 +1,110 @@
+import unittest
+from datetime import date
+
+import frappe
+
+from fours_customizations.money import to_minor
+from fours_customizations.overtime_tiers import compile_rate_table
+from fours_customizations.overtime_utils import apply_monthly_cap, summarize_overtime
+
+HOUR = 3600
+
+
+def _policy(cap):
+	return frappe._dict(
+		monthly_overtime_hour_cap=cap,
+		overtime_hourly_rate=100,
+		overtime_start_time='18:00:00',
+		overtime_end_time='23:00:00',
+		rate_table=compile_rate_table('18:00:00', '23:00:00', [{'from_time': '20:00:00', 'rate_multiplier': 1.5}])
+	)
+
+
+def _entry(attendance_date, hours):
+	return {
+		'date': attendance_date,
+		'overtime_seconds': hours * HOUR,
+		'overtime_hours': hours,
+		'hourly_rate': 100,
+		'rate_multiplier': 1,
+		'monthly_capped': False,
+		'unpaid_hours': 0,
+		'unpaid_seconds': 0
+	}
+
+
+class TestMonthlyCap(unittest.TestCase):
+	def test_no_cap(self):
+		entry = _entry(date(2025, 1, 2), 4)
+
+		self.assertIs(apply_monthly_cap(_policy(0), entry, {}), entry)
+
+	def test_days_up_to_the_cap_are_unchanged(self):
+		policy = _policy(8)
+		running_total = {}
+		entries = [_entry(date(2025, 1, 2), 4), _entry(date(2025, 1, 3), 4)]
+
+		for entry in entries:
+			self.assertIs(apply_monthly_cap(policy, entry, running_total), entry)
+
+		self.assertEqual(running_total['seconds'], 8 * HOUR)
+
+	def test_crossing_day_is_paid_up_to_the_cap(self):
+		policy = _policy(10)
+		running_total = {}
+		apply_monthly_cap(policy, _entry(date(2025, 1, 2), 4), running_total)
+		apply_monthly_cap(policy, _entry(date(2025, 1, 3), 4), running_total)
+
+		paid = apply_monthly_cap(policy, _entry(date(2025, 1, 4), 4), running_total)
+
+		self.assertTrue(paid['monthly_capped'])
+		self.assertEqual(paid['overtime_seconds'], 2 * HOUR)
+		self.assertEqual(paid['unpaid_seconds'], 2 * HOUR)
+		# The first two hours of the window, before the 1.5x tier
+		self.assertEqual(paid['overtime_amount_minor'], 2 * to_minor(100))
+
+	def test_cut_drops_the_latest_tiers(self):
+		policy = _policy(3)
+
+		paid = apply_monthly_cap(policy, _entry(date(2025, 1, 2), 4), {})
+
+		self.assertEqual(paid['overtime_seconds'], 3 * HOUR)
+		self.assertEqual(paid['overtime_amount_minor'], to_minor(100) * 2 + to_minor(150))
+
+	def test_days_after_the_cap_are_not_paid(self):
+		policy = _policy(4)
+		running_total = {}
+		apply_monthly_cap(policy, _entry(date(2025, 1, 2), 4), running_total)
+
+		paid = apply_monthly_cap(policy, _entry(date(2025, 1, 3), 3), running_total)
+
+		self.assertTrue(paid['monthly_capped'])
+		self.assertEqual(paid['overtime_seconds'], 0)
+		self.assertEqual(paid['overtime_amount_minor'], 0)
+		self.assertEqual(paid['unpaid_seconds'], 3 * HOUR)
+
+	def test_total_restarts_each_month(self):
+		policy = _policy(4)
+		running_total = {}
+		apply_monthly_cap(policy, _entry(date(2025, 1, 31), 4), running_total)
+
+		entry = _entry(date(2025, 2, 1), 4)
+
+		self.assertIs(apply_monthly_cap(policy, entry, running_total), entry)
+		self.assertEqual(running_total, {'month': (2025, 2), 'seconds': 4 * HOUR})
+
+	def test_carry_in_counts_towards_the_cap(self):
+		# A 26 Jan - 25 Feb period, with 3 hours paid earlier in January
+		carry_in = {'month': (2025, 1), 'seconds': 3 * HOUR}
+
+		days = [_entry(date(2025, 1, 27), 4), _entry(date(2025, 2, 3), 4)]
+		days[1]['overtime_amount_minor'] = 4 * to_minor(100)
+
+		result = summarize_overtime(_policy(4), days, carry_in)
+
+		self.assertEqual(result['total_hours'], 5)
+		self.assertEqual(result['unpaid_hours'], 3)
+		self.assertEqual(result['capped_days'], [date(2025, 1, 27)])
+		self.assertEqual(result['total_amount_minor'], to_minor(100) + 4 * to_minor(100))
+		# The carry-in is not changed
+		self.assertEqual(carry_in['seconds'], 3 * HOUR)
@@ -0,0 +1,62 @@
+import unittest
+from datetime import timedelta
+
+from fours_customizations.money import MULTIPLIER_SCALE
+from fours_customizations.overtime_tiers import compile_rate_table, get_weighted_seconds
+
+HOUR = 3600
+
+
+class TestOvertimeTiers(unittest.TestCase):
+	def test_window_without_tiers(self):
+		table = compile_rate_table('18:00:00', '23:00:00')
+
+		self.assertEqual(table['window_seconds'], 5 * HOUR)
+		self.assertEqual(table['breakpoints'], [0])
+		self.assertEqual(table['multipliers'], [MULTIPLIER_SCALE])
+
+	def test_window_wraps_past_midnight(self):
+		table = compile_rate_table('18:00:00', '01:00:00')
+
+		self.assertEqual(table['window_seconds'], 7 * HOUR)
+
+	def test_midnight_tier_loaded_as_timedelta(self):
+		# Child table Time values load as timedelta; 00:00 is timedelta(0)
+		table = compile_rate_table(
+			timedelta(hours=18),
+			timedelta(hours=3),
+			[{'from_time': timedelta(0), 'rate_multiplier': 2}]
+		)
+
+		self.assertEqual(table['breakpoints'], [0, 6 * HOUR])
+		self.assertEqual(table['multipliers'], [MULTIPLIER_SCALE, 2 * MULTIPLIER_SCALE])
+
+	def test_tiers_outside_the_window_are_ignored(self):
+		table = compile_rate_table('18:00:00', '22:00:00', [
+			{'from_time': '23:00:00', 'rate_multiplier': 3},
+			{'from_time': None, 'rate_multiplier': 3}
+		])
+
+		self.assertEqual(table['breakpoints'], [0])
+
+	def test_tier_at_the_start_replaces_the_base_rate(self):
+		table = compile_rate_table('18:00:00', '22:00:00', [{'from_time': '18:00:00', 'rate_multiplier': 1.25}])
+
+		self.assertEqual(table['breakpoints'], [0])
+		self.assertEqual(table['multipliers'], [1250])
+
+	def test_weighted_seconds_across_tiers(self):
+		table = compile_rate_table('18:00:00', '23:00:00', [
+			{'from_time': '20:00:00', 'rate_multiplier': 1.5},
+			{'from_time': '22:00:00', 'rate_multiplier': 2}
+		])
+
+		self.assertEqual(get_weighted_seconds(table, 0), 0)
+		self.assertEqual(get_weighted_seconds(table, -60), 0)
+		self.assertEqual(get_weighted_seconds(table, HOUR), HOUR * 1000)
+		self.assertEqual(get_weighted_seconds(table, 2 * HOUR), 2 * HOUR * 1000)
+		self.assertEqual(get_weighted_seconds(table, 3 * HOUR), 2 * HOUR * 1000 + HOUR * 1500)
+		self.assertEqual(
+			get_weighted_seconds(table, 5 * HOUR),
+			2 * HOUR * 1000 + 2 * HOUR * 1500 + HOUR * 2000
+		)
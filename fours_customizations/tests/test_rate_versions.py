@@ -0,0 +1,91 @@
+import unittest
+
+import frappe
+
+from fours_customizations.rate_versions import (
+	EMPTY_RATES_ZERO,
+	RATE_FIELDS,
+	compile_rate_versions,
+	get_rates_on,
+	has_versioned_rate,
+)
+
+BASE_RATES = {fieldname: 100 for fieldname in RATE_FIELDS}
+
+
+def _version(effective_from, **rates):
+	# Currency fields store an empty rate as 0
+	return {'effective_from': effective_from, **{fieldname: 0 for fieldname in RATE_FIELDS}, **rates}
+
+
+class TestRateVersions(unittest.TestCase):
+	def test_no_versions(self):
+		self.assertIsNone(compile_rate_versions([], BASE_RATES))
+		self.assertIsNone(compile_rate_versions([{'effective_from': None, 'late_deduction': 5}], BASE_RATES))
+
+	def test_empty_rates_carry_over(self):
+		compiled = compile_rate_versions([
+			_version('2025-03-01', absent_deduction=300),
+			_version('2025-02-01', late_deduction=150)
+		], BASE_RATES)
+
+		self.assertEqual(compiled['dates'], ['2025-02-01', '2025-03-01'])
+		self.assertEqual(compiled['rates'][0]['late_deduction'], 150)
+		self.assertEqual(compiled['rates'][0]['absent_deduction'], 100)
+		self.assertEqual(compiled['rates'][1]['late_deduction'], 150)
+		self.assertEqual(compiled['rates'][1]['absent_deduction'], 300)
+
+	def test_set_to_zero_lowers_empty_rates(self):
+		compiled = compile_rate_versions([
+			_version('2025-02-01', late_deduction=150),
+			{**_version('2025-03-01', absent_deduction=300), 'empty_rates': EMPTY_RATES_ZERO}
+		], BASE_RATES)
+
+		self.assertEqual(compiled['rates'][1]['absent_deduction'], 300)
+		self.assertEqual(compiled['rates'][1]['late_deduction'], 0)
+		self.assertEqual(compiled['rates'][1]['overtime_hourly_rate'], 0)
+
+	def test_employee_overrides_are_not_versioned(self):
+		compiled = compile_rate_versions(
+			[_version('2025-02-01', late_deduction=150, absent_deduction=300)],
+			BASE_RATES,
+			overrides=['late_deduction']
+		)
+
+		self.assertEqual(compiled['rates'][0]['late_deduction'], 100)
+		self.assertEqual(compiled['rates'][0]['absent_deduction'], 300)
+
+	def test_later_row_wins_on_the_same_date(self):
+		compiled = compile_rate_versions([
+			_version('2025-02-01', late_deduction=150),
+			_version('2025-02-01', late_deduction=175)
+		], BASE_RATES)
+
+		self.assertEqual(compiled['dates'], ['2025-02-01'])
+		self.assertEqual(compiled['rates'][0]['late_deduction'], 175)
+
+	def test_rates_on_a_day(self):
+		policy = frappe._dict(BASE_RATES, rate_versions=compile_rate_versions([
+			_version('2025-02-01', late_deduction=150),
+			_version('2025-03-01', late_deduction=200)
+		], BASE_RATES))
+
+		self.assertEqual(get_rates_on(policy, '2025-01-31')['late_deduction'], 100)
+		self.assertEqual(get_rates_on(policy, '2025-02-01')['late_deduction'], 150)
+		self.assertEqual(get_rates_on(policy, '2025-02-28')['late_deduction'], 150)
+		self.assertEqual(get_rates_on(policy, '2025-03-01')['late_deduction'], 200)
+
+	def test_rates_without_versions_are_the_policy(self):
+		policy = frappe._dict(BASE_RATES, rate_versions=None)
+
+		self.assertIs(get_rates_on(policy, '2025-02-01'), policy)
+
+	def test_has_versioned_rate(self):
+		base_rates = {**BASE_RATES, 'overtime_hourly_rate': 0}
+		policy = frappe._dict(base_rates, rate_versions=compile_rate_versions(
+			[_version('2025-02-01', overtime_hourly_rate=500)],
+			base_rates
+		))
+
+		self.assertTrue(has_versioned_rate(policy, 'overtime_hourly_rate'))
+		self.assertFalse(has_versioned_rate(frappe._dict(base_rates, rate_versions=None), 'overtime_hourly_rate'))
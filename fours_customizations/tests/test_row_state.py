@@ -0,0 +1,94 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+import frappe
+
+from fours_customizations.overtime_utils import OVERTIME_DENOMINATOR
+from fours_customizations.salary_slip_handler import _apply_attendance_changes, _pack_row, _unpack_row
+
+HOUR = 3600
+
+
+def _attendance(name, docstatus=1, late_entry=0):
+	return frappe._dict(
+		name=name,
+		docstatus=docstatus,
+		attendance_date='2025-01-02',
+		status='Present',
+		shift=None,
+		in_time=datetime(2025, 1, 2, 8, 0),
+		out_time=datetime(2025, 1, 2, 17, 0),
+		late_entry=late_entry,
+		early_exit=0,
+		modified='2025-01-10 12:00:00'
+	)
+
+
+class TestRowState(unittest.TestCase):
+	def test_violation_types_round_trip(self):
+		for types in [[], ['late'], ['absent', 'no_checkout'], ['late', 'early_exit', 'no_checkout']]:
+			contribution = ['2025-01-02', '2025-01-10 12:00:00', types, None]
+
+			self.assertEqual(_unpack_row('ATT-1', _pack_row(contribution)), contribution)
+
+	def test_types_are_packed_as_a_bitmask(self):
+		packed = _pack_row(['2025-01-02', '2025-01-10 12:00:00', ['late', 'no_checkout'], None])
+
+		# VIOLATION_TYPES order: absent, late, early_exit, no_checkout
+		self.assertEqual(packed[2], 0b1010)
+
+	def test_overtime_round_trip(self):
+		overtime = ['2025-01-02 20:00:00', 2 * HOUR, 2 * 150 * OVERTIME_DENOMINATOR, 0, 'Working', 'Day', 150, 1]
+		packed = ['2025-01-02', '2025-01-10 12:00:00', 0, overtime]
+
+		row = _unpack_row('ATT-1', packed)
+		entry = row[3]
+
+		self.assertEqual(entry['date'], date(2025, 1, 2))
+		self.assertEqual(entry['attendance'], 'ATT-1')
+		self.assertEqual(entry['checkout_time'], datetime(2025, 1, 2, 20, 0))
+		self.assertEqual(entry['overtime_hours'], 2)
+		self.assertFalse(entry['capped'])
+		self.assertEqual(_pack_row(row), packed)
+
+
+class TestApplyAttendanceChanges(unittest.TestCase):
+	def setUp(self):
+		self.policy = frappe._dict(employee='EMP-1')
+		self.previous_state = {
+			'computed_at': '2025-01-10 10:00:00',
+			'rows': {
+				'ATT-1': _pack_row(['2025-01-02', '2025-01-09 09:00:00', [], None]),
+				'ATT-2': _pack_row(['2025-01-03', '2025-01-09 09:00:00', [], None])
+			}
+		}
+
+	def _apply(self, changed, submitted):
+		with (
+			patch('frappe.get_all', return_value=changed) as get_all,
+			patch('frappe.db.count', return_value=submitted)
+		):
+			rows = _apply_attendance_changes(
+				self.policy, 'EMP-1', '2025-01-01', '2025-01-31', set(), {}, None, self.previous_state
+			)
+
+		return rows, get_all
+
+	def test_submitted_rows_are_reapplied_and_cancelled_rows_removed(self):
+		rows, get_all = self._apply([_attendance('ATT-1', late_entry=1), _attendance('ATT-2', docstatus=2)], 1)
+
+		self.assertEqual(list(rows), ['ATT-1'])
+		self.assertEqual(_unpack_row('ATT-1', rows['ATT-1'])[2], ['late'])
+		# Rows changed shortly before the previous computation are read again
+		self.assertEqual(get_all.call_args.kwargs['filters']['modified'], ['>=', datetime(2025, 1, 10, 9, 55)])
+
+	def test_previous_state_is_not_changed(self):
+		self._apply([_attendance('ATT-2', docstatus=2)], 1)
+
+		self.assertEqual(list(self.previous_state['rows']), ['ATT-1', 'ATT-2'])
+
+	def test_rows_deleted_unseen_force_a_rescan(self):
+		rows, _get_all = self._apply([], 1)
+
+		self.assertIsNone(rows)
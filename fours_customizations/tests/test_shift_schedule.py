@@ -0,0 +1,47 @@
+import unittest
+
+import frappe
+
+from fours_customizations.shift_schedule import OPEN_END, get_assigned_shift, get_scheduled_shift
+
+INTERVALS = {
+	'starts': ['2025-01-01', '2025-01-10', '2025-01-20'],
+	'ends': ['2025-01-31', '2025-01-12', OPEN_END],
+	'shifts': ['Day', 'Night', 'Evening']
+}
+
+
+class TestAssignedShift(unittest.TestCase):
+	def test_no_assignments(self):
+		self.assertIsNone(get_assigned_shift(None, '2025-01-05'))
+		self.assertIsNone(get_assigned_shift({'starts': [], 'ends': [], 'shifts': []}, '2025-01-05'))
+
+	def test_before_the_first_assignment(self):
+		self.assertIsNone(get_assigned_shift(INTERVALS, '2024-12-31'))
+
+	def test_start_and_end_are_included(self):
+		self.assertEqual(get_assigned_shift(INTERVALS, '2025-01-01'), 'Day')
+		self.assertEqual(get_assigned_shift(INTERVALS, '2025-01-10'), 'Night')
+		self.assertEqual(get_assigned_shift(INTERVALS, '2025-01-12'), 'Night')
+
+	def test_later_start_wins_where_assignments_overlap(self):
+		self.assertEqual(get_assigned_shift(INTERVALS, '2025-01-11'), 'Night')
+		self.assertEqual(get_assigned_shift(INTERVALS, '2025-01-25'), 'Evening')
+
+	def test_falls_back_to_an_earlier_assignment_still_running(self):
+		self.assertEqual(get_assigned_shift(INTERVALS, '2025-01-15'), 'Day')
+
+	def test_open_ended_assignment(self):
+		self.assertEqual(get_assigned_shift(INTERVALS, '2030-06-01'), 'Evening')
+
+	def test_gap_between_assignments(self):
+		intervals = {'starts': ['2025-01-01', '2025-02-01'], 'ends': ['2025-01-15', '2025-02-28'], 'shifts': ['Day', 'Night']}
+
+		self.assertIsNone(get_assigned_shift(intervals, '2025-01-20'))
+
+	def test_scheduled_shift(self):
+		shift_schedule = frappe._dict(windows={}, assignments={'EMP-1': INTERVALS})
+
+		self.assertEqual(get_scheduled_shift(shift_schedule, 'EMP-1', '2025-01-11'), 'Night')
+		self.assertIsNone(get_scheduled_shift(shift_schedule, 'EMP-2', '2025-01-11'))
+		self.assertIsNone(get_scheduled_shift(None, 'EMP-1', '2025-01-11'))
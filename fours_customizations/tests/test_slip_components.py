@@ -0,0 +1,61 @@
+import unittest
+
+import frappe
+
+from fours_customizations.slip_components import upsert_component
+
+
+class _Slip:
+	"""The child table methods of a Salary Slip that upsert_component uses"""
+
+	def __init__(self, deductions):
+		self.deductions = [frappe._dict(row) for row in deductions]
+
+	def get(self, table):
+		return getattr(self, table)
+
+	def append(self, table, row):
+		getattr(self, table).append(frappe._dict(row))
+
+	def remove(self, row):
+		self.deductions = [existing for existing in self.deductions if existing is not row]
+
+
+def _row(component, amount, depends_on_payment_days=0):
+	return {
+		'salary_component': component,
+		'amount': amount,
+		'default_amount': amount,
+		'depends_on_payment_days': depends_on_payment_days
+	}
+
+
+class TestUpsertComponent(unittest.TestCase):
+	def test_adds_a_missing_component(self):
+		slip = _Slip([_row('Basic Tax', 50)])
+
+		self.assertTrue(upsert_component(slip, 'deductions', 'Late Deduction', 200))
+		self.assertEqual(slip.deductions[1], frappe._dict(_row('Late Deduction', 200)))
+
+	def test_zero_amount_is_not_added(self):
+		slip = _Slip([])
+
+		self.assertFalse(upsert_component(slip, 'deductions', 'Late Deduction', 0))
+		self.assertEqual(slip.deductions, [])
+
+	def test_duplicates_are_removed(self):
+		slip = _Slip([_row('Late Deduction', 200), _row('Basic Tax', 50), _row('Late Deduction', 200)])
+
+		self.assertTrue(upsert_component(slip, 'deductions', 'Late Deduction', 200))
+		self.assertEqual([row.salary_component for row in slip.deductions], ['Late Deduction', 'Basic Tax'])
+
+	def test_unchanged_component(self):
+		slip = _Slip([_row('Late Deduction', 200)])
+
+		self.assertFalse(upsert_component(slip, 'deductions', 'Late Deduction', 200))
+
+	def test_updated_amount_is_not_prorated(self):
+		slip = _Slip([_row('Late Deduction', 200, depends_on_payment_days=1)])
+
+		self.assertTrue(upsert_component(slip, 'deductions', 'Late Deduction', 0))
+		self.assertEqual(slip.deductions, [frappe._dict(_row('Late Deduction', 0))])